@@ -2,5 +2,9 @@ from . import \
     itree, regex, regex_parser, automata, automata_dot, \
     automata_ops, automata_determ, regex_automata, \
     automata_complement, automata_minimize, regex_optimize, \
-    automata_cmp, regex_suff_parser, regex_longestsuff
+    automata_cmp, regex_suff_parser, regex_longestsuff, \
+    automata_intersect, regex_glushkov, regex_derivatives, \
+    charclass, automata_alphabet, automata_match, automata_bytes, \
+    automata_multi, automata_search, automata_codegen, regex_re, \
+    automata_frozen
 # TODO: automata_serialize, once implemented
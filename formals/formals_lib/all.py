@@ -1,13 +1,25 @@
 from .itree import *
+from .charclass import *
 from .regex import *
 from .automata import *
 from .regex_parser import *
 from .automata_dot import *
 from .automata_ops import *
 from .automata_determ import *
+from .regex_glushkov import *
+from .regex_derivatives import *
 from .regex_automata import *
 from .automata_complement import *
+from .automata_intersect import *
+from .automata_alphabet import *
 from .automata_minimize import *
+from .automata_match import *
+from .automata_codegen import *
+from .automata_frozen import *
+from .automata_bytes import *
+from .automata_multi import *
+from .automata_search import *
+from .regex_re import *
 from .regex_optimize import *
 from .automata_cmp import *
 from .regex_suff_parser import *
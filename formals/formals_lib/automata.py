@@ -3,6 +3,8 @@ import typing
 import dataclasses
 from collections import deque
 
+from .charclass import CharClass
+
 
 KeyType = typing.Any
 
@@ -24,11 +26,15 @@ class Node:
     #                     or_none: bool = True) -> Edge | None:
     #     raise NotImplementedError()
     
-    def get_only_edge(self, label: str, *, or_none: bool = False) -> "Edge" | None:
+    def get_only_edge(self, label: str | CharClass, *, or_none: bool = False) -> "Edge" | None:
+        """
+        Note: a CharClass label also matches any single letter it contains
+        """
+
         result: Edge | None = None
         
         for edge in self.out:
-            if edge.label != label:
+            if edge.label != label and not (isinstance(edge.label, CharClass) and label in edge.label):
                 continue
             if result is not None:
                 raise LookupError("Duplicate edge with fitting label")
@@ -41,7 +47,17 @@ class Node:
         return result
     
     def is_deterministic(self) -> bool:
-        return all(len(e) == 1 for e in self.out) and len(set(map(lambda x: x.label, self.out))) == len(self.out)
+        if not all(len(e) == 1 for e in self.out):
+            return False
+        
+        labels: typing.List[str | CharClass] = [edge.label for edge in self.out]
+        
+        if all(isinstance(label, str) for label in labels):
+            return len(set(labels)) == len(labels)
+        
+        # Distinct classes may still overlap
+        classes: typing.List[CharClass] = list(map(CharClass.of, labels))
+        return len(CharClass.union_of(classes)) == sum(map(len, classes))
     
     def __hash__(self) -> int:
         # It's certainly fine here, since we never consider nodes 'equal'
@@ -54,11 +70,14 @@ class Node:
 # TODO: ?
 @dataclasses.dataclass(frozen=True)
 class Edge:
-    label: str
+    # A CharClass label stands for any single letter out of it
+    label: str | CharClass
     src: "Node"
     dst: "Node"
 
     def __len__(self) -> int:
+        if isinstance(self.label, CharClass):
+            return 1
         return len(self.label)
 
 
@@ -114,7 +133,7 @@ class Automata:
     def __contains__(self, key: KeyType) -> Node:
         return key in self._node_lookup
 
-    def link(self, src: Node | KeyType, dst: Node | KeyType, label: str) -> Edge:
+    def link(self, src: Node | KeyType, dst: Node | KeyType, label: str | CharClass) -> Edge:
         if not isinstance(src, Node):
             src = self.node(src)
         if not isinstance(dst, Node):
@@ -143,14 +162,21 @@ class Automata:
         return Node
     
     def remove_nodes(self, nodes: typing.Iterable[Node | KeyType]) -> None:
-        nodes: typing.Set[Node] = set(nodes)
+        nodes: typing.Set[Node] = set(
+            node if isinstance(node, Node) else self.node(node)
+            for node in nodes
+        )
+
+        if not nodes:
+            return
 
         for node in nodes:
-            if not isinstance(node, Node):
-                node = self.node(node)
             assert node in self._nodes
             assert node is not self.start, "Cannot remove the start node"
             self._nodes.remove(node)
+            
+            if self._node_lookup.get(node.key) is node:
+                del self._node_lookup[node.key]
 
         # Copying to avoid messing up the iteration
         for edge in list(self.get_edges()):
@@ -161,10 +187,9 @@ class Automata:
         if not isinstance(node, Node):
             node = self.node(node)
         
-        # Copying to avoid messing up the iteration
-        for k, v in list(self._node_lookup.items()):
-            if v is node:
-                self._node_lookup.pop(k)
+        # The lookup is always keyed by node.key, so there's no need to search for the old entry
+        if self._node_lookup.get(node.key) is node:
+            del self._node_lookup[node.key]
         
         if key is None:
             key = self._get_next_id()
@@ -188,28 +213,62 @@ class Automata:
     def get_terms(self) -> typing.Iterable[Node]:
         return (node for node in self.get_nodes() if node.is_term)
     
+    def get_in_edges(self) -> typing.Dict[Node, typing.List[Edge]]:
+        """
+        Builds a reverse adjacency index: node -> edges leading into it.
+        Nodes without incoming edges are absent from the result
+        """
+
+        result: typing.Dict[Node, typing.List[Edge]] = {}
+
+        for edge in self.get_edges():
+            result.setdefault(edge.dst, []).append(edge)
+        
+        return result
+    
     def is_deterministic(self) -> bool:
         return all(node.is_deterministic() for node in self.get_nodes())
     
     def copy(self) -> Automata:
-        result = Automata(self.alphabet)
+        """
+        Clones the structure directly, without going through make_node and link,
+        so the whole thing takes O(|V| + |E|)
+        """
+
+        # Bypassing __init__, since it would create an extra start node
+        result: Automata = Automata.__new__(Automata)
 
+        result.alphabet = self.alphabet
         result._next_id = self._next_id
-        result.start.is_term = self.start.is_term
-        result.change_key(result.start, self.start.key)
 
-        for node in self.get_nodes():
-            if node is self.start:
-                continue
-            result.make_node(key=node.key, term=node.is_term)
-        
+        node_map: typing.Dict[Node, Node] = {
+            node: Node(node.key, is_term=node.is_term) for node in self.get_nodes()
+        }
+
+        result._nodes = set(node_map.values())
+        result._node_lookup = {node.key: node for node in result._nodes}
+        result._edges = set()
+        result.start = node_map[self.start]
+
         for edge in self.get_edges():
-            result.link(edge.src.key, edge.dst.key, edge.label)
+            new_edge: Edge = Edge(edge.label, node_map[edge.src], node_map[edge.dst])
+            result._edges.add(new_edge)
+            new_edge.src.out.add(new_edge)
         
         return result
 
     def __copy__(self) -> Automata:
         return self.copy()
+
+    def freeze(self) -> "FrozenAutomata":
+        """
+        Compiles the automata into an immutable, hashable DFA, see FrozenAutomata
+        """
+
+        # Imported here, since automata_frozen depends on this module
+        from .automata_frozen import FrozenAutomata
+
+        return FrozenAutomata.from_automata(self)
     
     # def __deepcopy__(self, memo: typing.Dict) -> Automata:
     #     return self.copy()
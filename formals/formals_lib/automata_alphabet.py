@@ -0,0 +1,104 @@
+from __future__ import annotations
+import typing
+import bisect
+
+from .automata import *
+from .charclass import CharClass
+
+
+class AlphabetClasses:
+    """
+    Partitions the letters into classes, such that the letters of one class
+    behave identically on every edge of the automata. Table-driven algorithms
+    may then work with class ids, whose amount only depends on the amount of
+    distinct behaviours, instead of with the letters themselves.
+    The letters of the alphabet that never occur on edges form a class as well
+    """
+
+    classes: typing.List[CharClass]
+    # (lo, hi, class id) for all the ranges of all the classes, sorted
+    _ranges: typing.List[typing.Tuple[int, int, int]]
+    # The translation table, filled lazily
+    _lookup: typing.Dict[str, int | None]
+
+
+    def __init__(self, aut: Automata):
+        labels: typing.List[CharClass] = [CharClass.from_letters(aut.alphabet)]
+
+        for edge in aut.get_edges():
+            if isinstance(edge.label, CharClass):
+                labels.append(edge.label)
+                continue
+
+            # Every position of a long label distinguishes its letter on its own
+            labels.extend(map(CharClass.from_letters, edge.label))
+
+        self.classes = [piece for piece, _ in CharClass.split(labels)]
+
+        self._ranges = sorted(
+            (lo, hi, class_id)
+            for class_id, piece in enumerate(self.classes)
+            for lo, hi in piece.ranges
+        )
+        self._lookup = {}
+
+    def __len__(self) -> int:
+        return len(self.classes)
+
+    def class_of(self, letter: str) -> int | None:
+        """
+        None means the letter doesn't occur on any edge, nor in the alphabet
+        """
+
+        result: int | None = self._lookup.get(letter, -1)
+
+        if result == -1:
+            code: int = ord(letter)
+            i: int = bisect.bisect_right(self._ranges, (code, float("inf"))) - 1
+
+            result = None
+            if i >= 0 and self._ranges[i][1] >= code:
+                result = self._ranges[i][2]
+
+            self._lookup[letter] = result
+
+        return result
+
+    def classes_of(self, label: str | CharClass) -> typing.List[int]:
+        """
+        The ids of the classes making up a single letter label.
+        Takes O(log + the amount of the ranges involved), by bisecting the sorted ranges
+        """
+
+        label = CharClass.of(label)
+        result: typing.Set[int] = set()
+
+        for lo, hi in label.ranges:
+            # The first range ending at or after lo
+            i: int = bisect.bisect_left(self._ranges, (lo, -1, -1))
+            if i > 0 and self._ranges[i - 1][1] >= lo:
+                i -= 1
+
+            while i < len(self._ranges) and self._ranges[i][0] <= hi:
+                result.add(self._ranges[i][2])
+                i += 1
+
+        return sorted(result)
+
+    def representative(self, class_id: int) -> str:
+        return chr(self.classes[class_id].ranges[0][0])
+
+    def compress(self, word: str) -> typing.List[int | None]:
+        return [self.class_of(letter) for letter in word]
+
+    def expand(self, class_id: int) -> CharClass:
+        return self.classes[class_id]
+
+
+def alphabet_classes(aut: Automata) -> AlphabetClasses:
+    return AlphabetClasses(aut)
+
+
+__all__ = [
+    "AlphabetClasses", "alphabet_classes",
+]
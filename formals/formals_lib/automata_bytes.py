@@ -0,0 +1,136 @@
+from __future__ import annotations
+import typing
+
+from .automata import *
+from .automata_ops import *
+from .charclass import CharClass
+
+
+# Bytes are represented by the letters with the same code points (as in latin-1)
+BYTE_ALPHABET: typing.Final[str] = ''.join(map(chr, range(256)))
+
+_SURROGATES: typing.Final[typing.Tuple[int, int]] = (0xD800, 0xDFFF)
+
+# The largest code points encoded with 1, 2 and 3 bytes
+_LENGTH_BOUNDARIES: typing.Final[typing.Tuple[int, ...]] = (0x7F, 0x7FF, 0xFFFF)
+
+
+def utf8_sequences(lo: int, hi: int) -> typing.Generator[typing.Tuple[typing.Tuple[int, int], ...], None, None]:
+    """
+    Splits the code point range lo-hi into sequences of byte ranges, such that
+    the UTF-8 encodings of the range's code points are exactly the byte strings
+    matching one of the sequences. Surrogates are skipped, as they can't be encoded
+    """
+
+    stack: typing.List[typing.Tuple[int, int]] = [(lo, hi)]
+
+    while stack:
+        lo, hi = stack.pop()
+
+        if lo > hi:
+            continue
+
+        if lo <= _SURROGATES[1] and hi >= _SURROGATES[0]:
+            stack.append((_SURROGATES[1] + 1, hi))
+            stack.append((lo, _SURROGATES[0] - 1))
+            continue
+
+        split: typing.Tuple[typing.Tuple[int, int], typing.Tuple[int, int]] | None = None
+
+        # Both ends have to be encoded with the same amount of bytes...
+        for boundary in _LENGTH_BOUNDARIES:
+            if lo <= boundary < hi:
+                split = (lo, boundary), (boundary + 1, hi)
+                break
+
+        # ...and the continuation bytes have to span their full range,
+        # unless the leading bytes are the same
+        if split is None:
+            for i in range(1, len(chr(lo).encode())):
+                mask: int = (1 << (6 * i)) - 1
+
+                if lo & ~mask == hi & ~mask:
+                    continue
+
+                if lo & mask != 0:
+                    split = (lo, lo | mask), ((lo | mask) + 1, hi)
+                    break
+
+                if hi & mask != mask:
+                    split = (lo, (hi & ~mask) - 1), (hi & ~mask, hi)
+                    break
+
+        if split is not None:
+            stack.append(split[1])
+            stack.append(split[0])
+            continue
+
+        yield tuple(zip(chr(lo).encode(), chr(hi).encode()))
+
+
+class AutomataToUtf8(BaseAutomataTransform):
+    """
+    Lowers a letter automata to a byte one, which accepts the UTF-8 encodings
+    of the original words. Class labels become chains of byte range labels,
+    sharing common prefixes, so wide classes still take few edges
+    """
+
+    def apply(self, inplace: bool = False) -> Automata:
+        result: Automata = self.raw_target(inplace)
+
+        result.alphabet = BYTE_ALPHABET
+
+        # Copying to avoid messing up the iteration
+        for node in list(result.get_nodes()):
+            self.lower_edges(result, node)
+
+        return result
+
+    @staticmethod
+    def label_sequences(label: str | CharClass) -> typing.Generator[typing.Tuple[typing.Tuple[int, int], ...], None, None]:
+        if isinstance(label, str):
+            yield tuple((byte, byte) for byte in label.encode())
+            return
+
+        for lo, hi in label.ranges:
+            yield from utf8_sequences(lo, hi)
+
+    @classmethod
+    def lower_edges(cls, aut: Automata, src: Node) -> None:
+        # (parent, byte range) -> child
+        trie: typing.Dict[typing.Tuple[Node, typing.Tuple[int, int]], Node] = {}
+
+        for edge in list(src.out):
+            # Epsilon edges and the ones that are already ASCII stay as they are
+            if isinstance(edge.label, str) and edge.label.isascii():
+                continue
+
+            aut.unlink(edge)
+
+            for sequence in cls.label_sequences(edge.label):
+                prev: Node = src
+
+                for byte_range in sequence[:-1]:
+                    cur: Node | None = trie.get((prev, byte_range))
+
+                    if cur is None:
+                        cur = aut.make_node()
+                        aut.link(prev, cur, cls.byte_label(byte_range))
+                        trie[prev, byte_range] = cur
+
+                    prev = cur
+
+                aut.link(prev, edge.dst, cls.byte_label(sequence[-1]))
+
+    @staticmethod
+    def byte_label(byte_range: typing.Tuple[int, int]) -> str | CharClass:
+        return CharClass((byte_range,)).as_label()
+
+
+def aut_to_utf8(aut: Automata, inplace: bool = False) -> Automata:
+    return AutomataToUtf8(aut).apply(inplace)
+
+
+__all__ = [
+    "BYTE_ALPHABET", "utf8_sequences", "aut_to_utf8",
+]
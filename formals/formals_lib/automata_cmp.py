@@ -4,17 +4,21 @@ from collections import deque
 
 from .automata import *
 from .automata_determ import make_full_dfa
+from .charclass import CharClass
 
 
 class AutomataComparator:
     _auts: typing.Tuple[Automata, Automata]
     _visited: typing.Set[typing.Tuple[Node, Node]]
     _queue: typing.Deque[typing.Tuple[Node, Node]]
+    # Not a part of any automata: non-terminal and without edges
+    _dead: Node
     
     def __init__(self, aut1: Automata, aut2: Automata) -> None:
         self._auts = (make_full_dfa(aut1), make_full_dfa(aut2))
         self._visited = set()
         self._queue = deque()
+        self._dead = Node(None)
         
         self._queue.append((self._auts[0].start, self._auts[1].start))
     
@@ -30,10 +34,22 @@ class AutomataComparator:
             if node1.is_term != node2.is_term:
                 return False
             
-            for edge1 in node1.out:
-                edge2 = node2.get_only_edge(edge1.label)
+            edges1: typing.List[Edge] = list(node1.out)
+            edges2: typing.List[Edge] = list(node2.out)
+            
+            # Both are DFAs, so each piece is covered by at most one edge on each side.
+            # Letters outside of one of the alphabets lead to the dead node on that side
+            for piece, indices in CharClass.split([CharClass.of(edge.label) for edge in edges1 + edges2]):
+                dst1: Node = self._dead
+                dst2: Node = self._dead
+                
+                for i in indices:
+                    if i < len(edges1):
+                        dst1 = edges1[i].dst
+                    else:
+                        dst2 = edges2[i - len(edges1)].dst
                 
-                self._queue.append((edge1.dst, edge2.dst))
+                self._queue.append((dst1, dst2))
         
         return True
 
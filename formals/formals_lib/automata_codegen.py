@@ -0,0 +1,183 @@
+from __future__ import annotations
+import typing
+import types
+import functools
+
+from .automata import *
+from .automata_match import DFAMatcher
+from .charclass import CharClass
+
+
+# Automatas with at most this many states get nested ifs by default
+_MAX_IF_STATES: typing.Final[int] = 4
+# The dict tables list every letter explicitly, so wide classes don't fit them
+_MAX_TABLE_LETTERS: typing.Final[int] = 4096
+
+# How many distinct sources keep their code objects around
+_CODE_CACHE_SIZE: typing.Final[int] = 128
+
+
+@functools.lru_cache(maxsize=_CODE_CACHE_SIZE)
+def _compile_source(source: str) -> types.CodeType:
+    # Shared by all the matchers with the same source
+    return compile(source, "<compiled dfa>", "exec")
+
+
+class CompiledMatcher:
+    """
+    A matcher function generated for a specific DFA. The source is self-contained,
+    so it may be inspected, stored and later passed back to the constructor
+    """
+
+    source: str
+    accepts: typing.Callable[[str], bool]
+
+
+    def __init__(self, source: str):
+        self.source = source
+
+        namespace: typing.Dict[str, typing.Any] = {}
+        exec(_compile_source(source), namespace)
+
+        self.accepts = namespace["accepts"]
+
+    def __call__(self, word: str) -> bool:
+        return self.accepts(word)
+
+
+class DFACodegen:
+    """
+    Generates the Python source of a matcher for the automata. Either as a tuple
+    of dicts, one per state, mapping letters to the next states ("table"),
+    or as a chain of ifs over the states and the letter ranges ("if")
+    """
+
+    matcher: DFAMatcher
+
+
+    def __init__(self, aut: Automata):
+        self.matcher = DFAMatcher(aut)
+
+    def default_mode(self) -> str:
+        if len(self.matcher) <= _MAX_IF_STATES:
+            return "if"
+
+        if sum(map(len, self.matcher.classes.classes)) > _MAX_TABLE_LETTERS:
+            return "if"
+
+        return "table"
+
+    def generate(self, mode: str | None = None) -> str:
+        if mode is None:
+            mode = self.default_mode()
+
+        if mode == "table":
+            return self.generate_table()
+        if mode == "if":
+            return self.generate_if()
+
+        raise ValueError(f"Unknown code generation mode: {mode!r}")
+
+    def targets(self, state: int) -> typing.Dict[int, CharClass]:
+        """
+        Maps the states reachable from state to the letters leading there
+        """
+
+        result: typing.Dict[int, CharClass] = {}
+
+        for class_id, target in enumerate(self.matcher.transitions[state]):
+            if target >= 0:
+                result[target] = result.get(target, CharClass()) | self.matcher.classes.expand(class_id)
+
+        return result
+
+    def terms(self) -> typing.List[int]:
+        return [state for state, is_term in enumerate(self.matcher.terms) if is_term]
+
+    def generate_table(self) -> str:
+        lines: typing.List[str] = [
+            f"_START = {self.matcher.start}",
+            f"_TERMS = frozenset({self.terms()!r})",
+            "_TABLE = (",
+        ]
+
+        for state in range(len(self.matcher)):
+            entries: str = ", ".join(
+                f"{letter!r}: {target}"
+                for target, letters in self.targets(state).items()
+                for letter in letters
+            )
+
+            lines.append(f"    {{{entries}}},")
+
+        lines += [
+            ")",
+            "",
+            "",
+            "def accepts(word):",
+            "    table = _TABLE",
+            "    state = _START",
+            "    try:",
+            "        for letter in word:",
+            "            state = table[state][letter]",
+            "    except KeyError:",
+            "        return False",
+            "    return state in _TERMS",
+        ]
+
+        return "\n".join(lines) + "\n"
+
+    def generate_if(self) -> str:
+        lines: typing.List[str] = [
+            "def accepts(word):",
+            f"    state = {self.matcher.start}",
+            "    for letter in word:",
+        ]
+
+        for state in range(len(self.matcher)):
+            lines.append(f"        {'if' if state == 0 else 'elif'} state == {state}:")
+
+            targets: typing.Dict[int, CharClass] = self.targets(state)
+
+            if not targets:
+                lines.append("            return False")
+                continue
+
+            for i, (target, letters) in enumerate(targets.items()):
+                lines.append(f"            {'if' if i == 0 else 'elif'} {self.condition(letters)}:")
+                lines.append(f"                state = {target}")
+
+            lines.append("            else:")
+            lines.append("                return False")
+
+        lines.append(f"    return state in {tuple(self.terms())!r}")
+
+        return "\n".join(lines) + "\n"
+
+    @staticmethod
+    def condition(letters: CharClass) -> str:
+        parts: typing.List[str] = []
+
+        for lo, hi in letters.ranges:
+            if lo == hi:
+                parts.append(f"letter == {chr(lo)!r}")
+            else:
+                parts.append(f"{chr(lo)!r} <= letter <= {chr(hi)!r}")
+
+        return " or ".join(parts)
+
+
+def compile_to_python(aut: Automata, mode: str | None = None) -> CompiledMatcher:
+    """
+    mode may be one of:
+     - "table": a tuple of dicts, one lookup per letter
+     - "if": nested ifs, which beat the dicts for tiny automatas
+     - None: picks one of the above based on the automata's size
+    """
+
+    return CompiledMatcher(DFACodegen(aut).generate(mode))
+
+
+__all__ = [
+    "CompiledMatcher", "DFACodegen", "compile_to_python",
+]
@@ -6,8 +6,8 @@ from .automata_determ import MakeFullDFA
 
 
 class AutomataComplement(MakeFullDFA):
-    def apply(self) -> Automata:
-        result: Automata = super().apply()
+    def apply(self, inplace: bool = False) -> Automata:
+        result: Automata = super().apply(inplace)
         
         for node in result.get_nodes():
             node.is_term = not node.is_term
@@ -15,8 +15,8 @@ class AutomataComplement(MakeFullDFA):
         return result
 
 
-def complement(aut: Automata) -> Automata:
-    return AutomataComplement(aut).apply()
+def complement(aut: Automata, inplace: bool = False) -> Automata:
+    return AutomataComplement(aut).apply(inplace)
 
 
 __all__ = [
@@ -5,39 +5,52 @@ from collections import deque
 
 from .automata import *
 from .automata_ops import *
+from .charclass import CharClass
 
 
 class MakeEdges01(BaseAutomataTransform):
-    def apply(self) -> Automata:
-        result: Automata = self.raw_copy()
+    def apply(self, inplace: bool = False) -> Automata:
+        result: Automata = self.raw_target(inplace)
         
         # Copying to avoid messing up the iteration
-        for edge in list(result.get_edges()):
-            edge: Edge
+        for node in list(result.get_nodes()):
+            node: Node
 
-            self.split_edge(result, edge)
+            self.split_edges(result, node)
 
         return result
     
     @staticmethod
-    def split_edge(aut: Automata, edge: Edge) -> None:
-        if len(edge) <= 1:
-            return
-        
-        aut.unlink(edge)
-        
-        prev: Node = edge.src
-        cur: Node
-        for i in range(len(edge) - 1):
-            cur = aut.make_node()
-            aut.link(prev, cur, edge.label[i])
-            prev = cur
-        aut.link(prev, edge.dst, edge.label[-1])
+    def split_edges(aut: Automata, src: Node) -> None:
+        """
+        Splits all the long edges going out of src. The intermediate nodes
+        form a trie of labels, so edges with common prefixes share them
+        """
+
+        long_edges: typing.List[Edge] = [edge for edge in src.out if len(edge) > 1]
+
+        # (parent, letter) -> child
+        trie: typing.Dict[typing.Tuple[Node, str], Node] = {}
+
+        for edge in long_edges:
+            aut.unlink(edge)
+
+            prev: Node = edge.src
+            for letter in edge.label[:-1]:
+                cur: Node | None = trie.get((prev, letter))
+
+                if cur is None:
+                    cur = aut.make_node()
+                    aut.link(prev, cur, letter)
+                    trie[prev, letter] = cur
+                
+                prev = cur
+            aut.link(prev, edge.dst, edge.label[-1])
 
 
 class MakeEdges1(MakeEdges01):
-    def apply(self) -> Automata:
-        result: Automata = super().apply()
+    def apply(self, inplace: bool = False) -> Automata:
+        result: Automata = super().apply(inplace)
         
         self.propagate_terms(result)
 
@@ -110,8 +123,8 @@ class MakeEdges1(MakeEdges01):
 
 
 class UnifyTerm(BaseAutomataTransform):
-    def apply(self) -> Automata:
-        result: Automata = self.raw_copy()
+    def apply(self, inplace: bool = False) -> Automata:
+        result: Automata = self.raw_target(inplace)
         
         end: Node = result.make_node(term=True)
 
@@ -133,15 +146,33 @@ class MakeDeterministic(BaseAutomataTransform):
 
         def frozen_members(self) -> typing.FrozenSet[Node]:
             return frozenset(self.members)
+        
+        def add(self, node: Node) -> None:
+            self.members.add(node.key)
+            self.is_term = self.is_term or node.is_term
     
 
-    def apply(self) -> Automata:
+    def apply(self, inplace: bool = False) -> Automata:
+        """
+        Note: unless the input is already deterministic, a new automata
+        is built anyway, so inplace only allows to spoil the input
+        """
+
         if self.aut.is_deterministic():
-            return self.aut.copy()  # TODO: Maybe not copy?
+            return self.raw_target(inplace)
 
         # We'll use that for our guideline, not the result
-        self.aut = make_edges_1(self.aut)
-        self.aut = aut_trim(self.aut)
+        self.aut = make_edges_1(self.aut, inplace=inplace)
+        # Dead states would only produce useless subsets
+        self.aut = aut_trim(self.aut, coaccessible=True, inplace=True)
+
+        return self.subset_construction()
+    
+    def subset_construction(self) -> Automata:
+        """
+        Expects self.aut to be epsilon-free. The keys of the result
+        are the frozensets of the keys of the corresponding subsets
+        """
 
         result = Automata(self.aut.alphabet)
 
@@ -160,7 +191,7 @@ class MakeDeterministic(BaseAutomataTransform):
             edges = self.gather_edges(node)
 
             for label, dst_info in edges.items():
-                label: str
+                label: str | CharClass
                 dst_info: self._NodeInfo
 
                 dst_key = dst_info.frozen_members()
@@ -177,54 +208,92 @@ class MakeDeterministic(BaseAutomataTransform):
 
         return result
     
-    def gather_edges(self, node: Node) -> typing.Dict[str, _NodeInfo]:
+    def gather_edges(self, node: Node) -> typing.Dict[str | CharClass, _NodeInfo]:
+        edges: typing.List[Edge] = [edge for subkey in node.key for edge in self.aut[subkey].out]
+
+        if any(isinstance(edge.label, CharClass) for edge in edges):
+            return self.gather_class_edges(edges)
+
         result: typing.Dict[str, self._NodeInfo] = {}
 
-        for subkey in node.key:
-            for edge in self.aut[subkey].out:
-                cur_node_info: self._NodeInfo = result.setdefault(edge.label, self._NodeInfo())
-                cur_node_info.members.add(edge.dst.key)
-                cur_node_info.is_term = cur_node_info.is_term or edge.dst.is_term
+        for edge in edges:
+            cur_node_info: self._NodeInfo = result.setdefault(edge.label, self._NodeInfo())
+            cur_node_info.add(edge.dst)
 
         return result
+    
+    def gather_class_edges(self, edges: typing.Sequence[Edge]) -> typing.Dict[str | CharClass, _NodeInfo]:
+        """
+        Overlapping labels are split into disjoint pieces, each going to the union
+        of the destinations of the edges covering it. The pieces that end up going
+        to the same place are merged back, so the amount of edges doesn't depend
+        on the width of the classes
+        """
+
+        # members -> (label, info)
+        by_members: typing.Dict[typing.FrozenSet[KeyType], typing.Tuple[CharClass, self._NodeInfo]] = {}
+
+        for piece, indices in CharClass.split([CharClass.of(edge.label) for edge in edges]):
+            cur_node_info: self._NodeInfo = self._NodeInfo()
+            for i in indices:
+                cur_node_info.add(edges[i].dst)
+
+            members: typing.FrozenSet[KeyType] = cur_node_info.frozen_members()
+            if members in by_members:
+                piece = piece | by_members[members][0]
+
+            by_members[members] = (piece, cur_node_info)
+
+        return {piece.as_label(): cur_node_info for piece, cur_node_info in by_members.values()}
 
 
 class MakeFullDFA(MakeDeterministic):
-    def apply(self) -> Automata:
-        result: Automata = super().apply()
+    def apply(self, inplace: bool = False) -> Automata:
+        result: Automata = super().apply(inplace)
+
+        # The letters of class labels needn't be listed in the alphabet,
+        # so the ones that aren't get completed separately
+        letters: CharClass = CharClass.from_letters(result.alphabet)
+        class_letters: CharClass = CharClass.union_of(
+            edge.label for edge in result.get_edges() if isinstance(edge.label, CharClass)
+        ) - letters
 
         end: Node = result.make_node()
 
         for node in result.get_nodes():
-            missing_alphabet: typing.Set[str] = set(result.alphabet)
+            covered: CharClass = CharClass.union_of(CharClass.of(edge.label) for edge in node.out)
 
-            for edge in node.out:
-                missing_alphabet.discard(edge.label)
-            
-            for letter in missing_alphabet:
-                result.link(node, end, letter)
-        
-        return aut_trim(result)
+            for letter in letters:
+                if letter not in covered:
+                    result.link(node, end, letter)
+
+            # Everything else missing goes to the sink over a single edge
+            missing: CharClass = class_letters - covered
+
+            if missing:
+                result.link(node, end, missing.as_label())
+
+        return aut_trim(result, inplace=True)
 
 
-def make_edges_01(aut: Automata) -> Automata:
-    return MakeEdges01(aut).apply()
+def make_edges_01(aut: Automata, inplace: bool = False) -> Automata:
+    return MakeEdges01(aut).apply(inplace)
 
 
-def make_edges_1(aut: Automata) -> Automata:
-    return MakeEdges1(aut).apply()
+def make_edges_1(aut: Automata, inplace: bool = False) -> Automata:
+    return MakeEdges1(aut).apply(inplace)
 
 
-def unify_term(aut: Automata) -> Automata:
-    return UnifyTerm(aut).apply()
+def unify_term(aut: Automata, inplace: bool = False) -> Automata:
+    return UnifyTerm(aut).apply(inplace)
 
 
-def make_dfa(aut: Automata) -> Automata:
-    return MakeDeterministic(aut).apply()
+def make_dfa(aut: Automata, inplace: bool = False) -> Automata:
+    return MakeDeterministic(aut).apply(inplace)
 
 
-def make_full_dfa(aut: Automata) -> Automata:
-    return MakeFullDFA(aut).apply()
+def make_full_dfa(aut: Automata, inplace: bool = False) -> Automata:
+    return MakeFullDFA(aut).apply(inplace)
 
 
 __all__ = [
@@ -60,7 +60,7 @@ class AutomataDotDumper:
         return dot.Edge(
             self.dot_node_name(edge.src),
             self.dot_node_name(edge.dst),
-            label=edge.label or "<&epsilon;>",
+            label=str(edge.label) or "<&epsilon;>",
         )
     
     def _add_node(self, node: dot.Node) -> None:
@@ -0,0 +1,171 @@
+from __future__ import annotations
+import typing
+import dataclasses
+import bisect
+import concurrent.futures
+import itertools
+import functools
+
+from .automata import *
+from .automata_match import DFAMatcher
+
+
+@dataclasses.dataclass(frozen=True)
+class FrozenAutomata:
+    """
+    An immutable compiled DFA, made of tuples only. Matching keeps all of its
+    state in locals, so a single instance may be shared between threads without
+    any locking. DFAMatcher, in contrast, goes through AlphabetClasses.class_of,
+    which fills the AlphabetClasses._lookup cache as it goes. Being plain tuples,
+    it also pickles cheaply, e.g. for a process pool.
+    The states are numbered in BFS order and the letter classes by their lowest
+    letter, so freezing equal DFAs gives equal (and equally hashed) objects
+    """
+
+    alphabet: str
+    start: int
+    terms: typing.Tuple[bool, ...]
+    # state -> class id -> state, -1 standing for the dead state
+    transitions: typing.Tuple[typing.Tuple[int, ...], ...]
+    # The lowest code points of consecutive ranges, covering everything from the first letter on...
+    bounds: typing.Tuple[int, ...]
+    # ...and their class ids, -1 for the letters that don't occur anywhere
+    bound_classes: typing.Tuple[int, ...]
+
+    @classmethod
+    def from_automata(cls, aut: Automata) -> FrozenAutomata:
+        matcher = DFAMatcher(aut)
+
+        class_order: typing.List[int] = sorted(
+            range(len(matcher.classes)), key=lambda class_id: matcher.classes.expand(class_id).ranges
+        )
+
+        # Numbering the reachable states in BFS order, which is canonical
+        state_ids: typing.Dict[int, int] = {matcher.start: 0}
+        order: typing.List[int] = [matcher.start]
+
+        for state in order:
+            for class_id in class_order:
+                target: int = matcher.transitions[state][class_id]
+
+                if target >= 0 and target not in state_ids:
+                    state_ids[target] = len(order)
+                    order.append(target)
+
+        transitions: typing.Tuple[typing.Tuple[int, ...], ...] = tuple(
+            tuple(
+                state_ids.get(matcher.transitions[state][class_id], -1)
+                for class_id in class_order
+            )
+            for state in order
+        )
+
+        new_class_ids: typing.Dict[int, int] = {class_id: i for i, class_id in enumerate(class_order)}
+        ranges: typing.List[typing.Tuple[int, int, int]] = sorted(
+            (lo, hi, new_class_ids[class_id])
+            for class_id, piece in enumerate(matcher.classes.classes)
+            for lo, hi in piece.ranges
+        )
+
+        bounds: typing.List[int] = []
+        bound_classes: typing.List[int] = []
+
+        for lo, hi, class_id in ranges:
+            if bounds and bounds[-1] == lo:
+                # The gap placeholder of the previous range is not needed
+                bounds.pop()
+                bound_classes.pop()
+
+            bounds += [lo, hi + 1]
+            bound_classes += [class_id, -1]
+
+        return cls(
+            alphabet=aut.alphabet,
+            start=0,
+            terms=tuple(matcher.terms[state] for state in order),
+            transitions=transitions,
+            bounds=tuple(bounds),
+            bound_classes=tuple(bound_classes),
+        )
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def class_of(self, letter: str) -> int:
+        i: int = bisect.bisect_right(self.bounds, ord(letter)) - 1
+
+        return self.bound_classes[i] if i >= 0 else -1
+
+    def run(self, word: str) -> int:
+        """
+        Returns the state the word leads to, or -1 if it leads to the dead one
+        """
+
+        bounds: typing.Tuple[int, ...] = self.bounds
+        bound_classes: typing.Tuple[int, ...] = self.bound_classes
+        transitions: typing.Tuple[typing.Tuple[int, ...], ...] = self.transitions
+        bisect_right = bisect.bisect_right
+        state: int = self.start
+
+        for letter in word:
+            i: int = bisect_right(bounds, ord(letter)) - 1
+            class_id: int = bound_classes[i] if i >= 0 else -1
+
+            if class_id < 0:
+                return -1
+
+            state = transitions[state][class_id]
+
+            if state < 0:
+                return -1
+
+        return state
+
+    def accepts(self, word: str) -> bool:
+        state: int = self.run(word)
+
+        return state >= 0 and self.terms[state]
+
+
+def freeze(aut: Automata) -> FrozenAutomata:
+    return FrozenAutomata.from_automata(aut)
+
+
+def _accepts_chunk(frozen: FrozenAutomata, chunk: typing.Sequence[str]) -> typing.List[bool]:
+    # Module level, so that process pools can pickle it
+    return [frozen.accepts(word) for word in chunk]
+
+
+def accepts_many(aut: Automata | FrozenAutomata, words: typing.Iterable[str],
+                 max_workers: int | None = None, chunk_size: int = 1024,
+                 processes: bool = False) -> typing.List[bool]:
+    """
+    Checks all the words on a pool, max_workers being passed to it. The automata
+    is frozen once and shared by all the workers, and the words are handed out
+    in chunks of chunk_size, to keep the per-task overhead low.
+    Matching is pure Python, so due to the GIL a thread pool (the default) gives
+    no speedup: it is about sharing the automata safely. For throughput, pass
+    processes=True, which uses a process pool instead
+    """
+
+    if chunk_size < 1:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+
+    frozen: FrozenAutomata = aut if isinstance(aut, FrozenAutomata) else aut.freeze()
+
+    words = iter(words)
+    chunks: typing.Iterator[typing.List[str]] = iter(lambda: list(itertools.islice(words, chunk_size)), [])
+
+    executor_type: typing.Type[concurrent.futures.Executor] = (
+        concurrent.futures.ProcessPoolExecutor if processes else concurrent.futures.ThreadPoolExecutor
+    )
+
+    with executor_type(max_workers=max_workers) as executor:
+        return list(itertools.chain.from_iterable(
+            executor.map(functools.partial(_accepts_chunk, frozen), chunks)
+        ))
+
+
+__all__ = [
+    "FrozenAutomata", "freeze", "accepts_many",
+]
@@ -0,0 +1,91 @@
+from __future__ import annotations
+import typing
+from collections import deque
+
+from .automata import *
+from .automata_ops import *
+from .automata_determ import make_edges_1
+from .charclass import CharClass
+
+
+class AutomataIntersect(BaseAutomataBinOp):
+    """
+    Builds the synchronized product of the reachable pairs of nodes. The nodes get
+    fresh flat int keys, and the provenance maps them to tuples of (node1.key, node2.key)
+    """
+
+    def apply(self) -> Automata:
+        # Both automatas have to step over the same single letter at once
+        aut1: Automata = make_edges_1(self.aut1)
+        aut2: Automata = make_edges_1(self.aut2)
+
+        result = Automata(self.common_alphabet())
+
+        result.start.is_term = aut1.start.is_term and aut2.start.is_term
+        self._remember(result.start.key, (aut1.start.key, aut2.start.key))
+
+        pairs: typing.Dict[typing.Tuple[Node, Node], Node] = {
+            (aut1.start, aut2.start): result.start,
+        }
+
+        # Only the reachable pairs are ever built
+        queue: typing.Deque[typing.Tuple[Node, Node, Node]] = deque()
+        queue.append((aut1.start, aut2.start, result.start))
+
+        while queue:
+            node1, node2, node = queue.popleft()
+
+            for label, dst1, dst2 in self.match_edges(node1, node2):
+                dst: Node | None = pairs.get((dst1, dst2))
+
+                if dst is None:
+                    dst = result.make_node(term=dst1.is_term and dst2.is_term)
+                    pairs[dst1, dst2] = dst
+                    self._remember(dst.key, (dst1.key, dst2.key))
+                    queue.append((dst1, dst2, dst))
+                
+                result.link(node, dst, label)
+
+        # Most of the reachable product is still usually dead
+        return aut_trim(result, coaccessible=True, inplace=True)
+
+    @staticmethod
+    def match_edges(node1: Node, node2: Node) -> typing.Generator[typing.Tuple[str | CharClass, Node, Node], None, None]:
+        """
+        Yields (label, dst1, dst2) for every pair of edges with intersecting labels
+        """
+
+        outs2: typing.Dict[str, typing.List[Node]] = {}
+        class_edges2: typing.List[Edge] = []
+
+        for edge2 in node2.out:
+            if isinstance(edge2.label, CharClass):
+                class_edges2.append(edge2)
+            else:
+                outs2.setdefault(edge2.label, []).append(edge2.dst)
+
+        for edge1 in node1.out:
+            if isinstance(edge1.label, str):
+                for dst2 in outs2.get(edge1.label, ()):
+                    yield edge1.label, edge1.dst, dst2
+
+                for edge2 in class_edges2:
+                    if edge1.label in edge2.label:
+                        yield edge1.label, edge1.dst, edge2.dst
+
+                continue
+
+            for edge2 in node2.out:
+                common: CharClass = edge1.label & CharClass.of(edge2.label)
+
+                if common:
+                    yield common.as_label(), edge1.dst, edge2.dst
+
+
+def aut_intersect(aut1: Automata, aut2: Automata) -> Automata:
+    return AutomataIntersect(aut1, aut2).apply()
+
+
+__all__ = [
+    "aut_intersect",
+]
@@ -0,0 +1,212 @@
+from __future__ import annotations
+import typing
+import mmap
+
+from .automata import *
+from .automata_determ import make_dfa
+from .automata_alphabet import AlphabetClasses
+from .charclass import CharClass
+
+
+class DFAMatcher:
+    """
+    A table-driven DFA: states are ints, and the transitions are looked up
+    by the class id of the letter, so the table has one column per distinct
+    letter behaviour rather than per letter. -1 stands for the dead state
+    """
+
+    classes: AlphabetClasses
+    start: int
+    # state -> the key of the node it came from
+    keys: typing.List[KeyType]
+    transitions: typing.List[typing.List[int]]
+    terms: typing.List[bool]
+    # byte -> class id, -1 for the bytes that don't occur anywhere
+    _byte_table: typing.List[int]
+
+
+    def __init__(self, aut: Automata):
+        aut = make_dfa(aut)
+
+        self.classes = AlphabetClasses(aut)
+
+        nodes: typing.List[Node] = list(aut.get_nodes())
+        node_ids: typing.Dict[Node, int] = {node: i for i, node in enumerate(nodes)}
+
+        self.start = node_ids[aut.start]
+        self.keys = [node.key for node in nodes]
+        self.terms = [node.is_term for node in nodes]
+        self.transitions = [[-1] * len(self.classes) for _ in nodes]
+
+        for edge in aut.get_edges():
+            for class_id in self.classes.classes_of(edge.label):
+                self.transitions[node_ids[edge.src]][class_id] = node_ids[edge.dst]
+
+        self._byte_table = [
+            -1 if class_id is None else class_id
+            for class_id in map(self.classes.class_of, map(chr, range(256)))
+        ]
+
+    def __len__(self) -> int:
+        return len(self.terms)
+
+    def step(self, state: int, letter: str) -> int:
+        class_id: int | None = self.classes.class_of(letter)
+
+        if class_id is None or state < 0:
+            return -1
+
+        return self.transitions[state][class_id]
+
+    def run(self, word: str) -> int:
+        """
+        Returns the state the word leads to, or -1 if it leads to the dead one
+        """
+
+        # Hoisted, since this is the hot loop
+        class_of: typing.Callable[[str], int | None] = self.classes.class_of
+        transitions: typing.List[typing.List[int]] = self.transitions
+        state: int = self.start
+
+        for letter in word:
+            class_id: int | None = class_of(letter)
+
+            if class_id is None:
+                return -1
+
+            state = transitions[state][class_id]
+
+            if state < 0:
+                return -1
+
+        return state
+
+    def run_bytes(self, data: bytes | bytearray | memoryview | mmap.mmap) -> int:
+        """
+        Like run, but over raw bytes, each standing for the letter with the same code point.
+        So the automata should be over BYTE_ALPHABET, e.g. lowered with aut_to_utf8
+        to match UTF-8 text without decoding it. Anything supporting the buffer
+        protocol works, including mmap'ed files, and no copies are made
+        """
+
+        byte_table: typing.List[int] = self._byte_table
+        transitions: typing.List[typing.List[int]] = self.transitions
+        state: int = self.start
+
+        with memoryview(data) as raw, raw.cast("B") as view:
+            for byte in view:
+                class_id: int = byte_table[byte]
+
+                if class_id < 0:
+                    return -1
+
+                state = transitions[state][class_id]
+
+                if state < 0:
+                    return -1
+
+        return state
+
+    def accepts(self, word: str) -> bool:
+        state: int = self.run(word)
+
+        return state >= 0 and self.terms[state]
+
+    def accepts_bytes(self, data: bytes | bytearray | memoryview | mmap.mmap) -> bool:
+        state: int = self.run_bytes(data)
+
+        return state >= 0 and self.terms[state]
+
+
+class NFASimulator:
+    """
+    Checks words against the raw automata, without any preprocessing: the current
+    states are tracked as sets, a state being either a node or a position inside
+    a long label, i.e. an (edge, offset) pair. The epsilon successors of the nodes
+    are looked up on demand and cached, and the epsilon closure is taken once per
+    letter, over all the nodes stepped into. So a check takes O(len(word) * (|V| + |E|))
+    """
+
+    aut: Automata
+    _epsilon_out: typing.Dict[Node, typing.List[Node]]
+
+
+    def __init__(self, aut: Automata):
+        self.aut = aut
+        self._epsilon_out = {}
+
+    def epsilon_out(self, node: Node) -> typing.List[Node]:
+        result: typing.List[Node] | None = self._epsilon_out.get(node)
+
+        if result is None:
+            result = [edge.dst for edge in node.out if edge.label == ""]
+            self._epsilon_out[node] = result
+
+        return result
+
+    def closure(self, nodes: typing.Iterable[Node]) -> typing.Set[Node]:
+        """
+        The nodes reachable from nodes by epsilon edges, nodes themselves included.
+        Every node is expanded at most once
+        """
+
+        result: typing.Set[Node] = set(nodes)
+        stack: typing.List[Node] = list(result)
+
+        while stack:
+            for dst in self.epsilon_out(stack.pop()):
+                if dst not in result:
+                    result.add(dst)
+                    stack.append(dst)
+
+        return result
+
+    def accepts(self, word: str) -> bool:
+        nodes: typing.Set[Node] = self.closure([self.aut.start])
+        inner: typing.Set[typing.Tuple[Edge, int]] = set()
+
+        for letter in word:
+            targets: typing.Set[Node] = set()
+            next_inner: typing.Set[typing.Tuple[Edge, int]] = set()
+
+            for node in nodes:
+                for edge in node.out:
+                    label: str | CharClass = edge.label
+
+                    if isinstance(label, CharClass):
+                        if letter in label:
+                            targets.add(edge.dst)
+                    elif label[:1] == letter:
+                        if len(label) == 1:
+                            targets.add(edge.dst)
+                        else:
+                            next_inner.add((edge, 1))
+
+            for edge, offset in inner:
+                if edge.label[offset] != letter:
+                    continue
+
+                if offset + 1 == len(edge.label):
+                    targets.add(edge.dst)
+                else:
+                    next_inner.add((edge, offset + 1))
+
+            if not targets and not next_inner:
+                return False
+
+            nodes, inner = self.closure(targets), next_inner
+
+        return any(node.is_term for node in nodes)
+
+
+def dfa_matcher(aut: Automata) -> DFAMatcher:
+    return DFAMatcher(aut)
+
+
+def nfa_accepts(aut: Automata, word: str) -> bool:
+    return NFASimulator(aut).accepts(word)
+
+
+__all__ = [
+    "DFAMatcher", "NFASimulator", "dfa_matcher", "nfa_accepts",
+]
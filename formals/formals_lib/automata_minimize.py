@@ -6,6 +6,7 @@ from collections import UserDict, deque
 from .automata import *
 from .automata_ops import *
 from .automata_determ import *
+from .automata_alphabet import AlphabetClasses
 
 
 class _ClassMapper(UserDict):
@@ -33,14 +34,20 @@ class AutomataMinimizer(BaseAutomataTransform):
     _step_idx: int
     _aut_nodes: typing.Final[typing.List[Node]]
     _node_idx_lookup: typing.Final[typing.Mapping[Node, int]]
-    _transitions: typing.Final[typing.Mapping[typing.Tuple[int, str], int]]
+    _classes: typing.Final[AlphabetClasses]
+    # Keyed by (node idx, letter class id)
+    _transitions: typing.Final[typing.Mapping[typing.Tuple[int, int], int]]
     
     def __init__(self, aut: Automata):
         super().__init__(make_full_dfa(aut))
         del aut  # To avoid using it accidentally
         
+        # Letters that behave the same everywhere needn't be told apart
+        self._classes = AlphabetClasses(self.aut)
+        
+        initial_mapper = _ClassMapper()
         self._class_table = [
-            [int(node.is_term) for node in self.aut.get_nodes()],
+            [initial_mapper[self.initial_class(node)] for node in self.aut.get_nodes()],
             [None] * len(self.aut)
         ]
         self._step_idx = 0
@@ -50,6 +57,13 @@ class AutomataMinimizer(BaseAutomataTransform):
         }
         self._transitions = self._bake_transitions()
     
+    def initial_class(self, node: Node) -> typing.Hashable:
+        """
+        Nodes with different initial classes are never merged
+        """
+        
+        return node.is_term
+    
     def apply(self) -> Automata:
         while not self.is_table_identical():
             self.step()
@@ -57,19 +71,18 @@ class AutomataMinimizer(BaseAutomataTransform):
         return self.make_automata()
             
 
-    def _bake_transitions(self) -> typing.Mapping[typing.Tuple[int, str], int]:
-        transitions: typing.Dict[typing.Tuple[int, str], int] = {}
+    def _bake_transitions(self) -> typing.Mapping[typing.Tuple[int, int], int]:
+        transitions: typing.Dict[typing.Tuple[int, int], int] = {}
         
         for src_i, src in enumerate(self._aut_nodes):
             for edge in src.out:
-                state = (src_i, edge.label)
-                assert len(edge.label) == 1
-                assert state not in transitions, "Duplicate edge!"
+                dst_i = self.node_idx(edge.dst)
                 
-                dst = edge.dst
-                dst_i = self.node_idx(dst)
-                
-                transitions[state] = dst_i
+                for class_id in self._classes.classes_of(edge.label):
+                    state = (src_i, class_id)
+                    assert state not in transitions, "Duplicate edge!"
+                    
+                    transitions[state] = dst_i
         
         return transitions
     
@@ -85,8 +98,8 @@ class AutomataMinimizer(BaseAutomataTransform):
     def nodes_cnt(self) -> int:
         return len(self._aut_nodes)
     
-    def transition(self, src_i: int, letter: str) -> int:
-        return self._transitions[src_i, letter]
+    def transition(self, src_i: int, class_id: int) -> int:
+        return self._transitions[src_i, class_id]
     
     def node_idx(self, node: Node) -> int:
         return self._node_idx_lookup[node]
@@ -101,8 +114,8 @@ class AutomataMinimizer(BaseAutomataTransform):
         
         letter_table: typing.List[typing.Tuple[int, ...]] = [
             tuple(
-                prev_table[self.transition(i, letter)]
-                for letter in self.aut.alphabet
+                prev_table[self.transition(i, class_id)]
+                for class_id in range(len(self._classes))
             )
             for i in range(self.nodes_cnt)
         ]
@@ -133,11 +146,17 @@ class AutomataMinimizer(BaseAutomataTransform):
         result.set_start(cur_table[self.node_idx(self.aut.start)])
         result.remove_node(obsolete_start)
         
-        for edge in self.aut.get_edges():
-            class_src: int = cur_table[self.node_idx(edge.src)]
-            class_dst: int = cur_table[self.node_idx(edge.dst)]
+        # The members of a class may label their edges differently (with classes),
+        # so only a single representative's edges are taken
+        linked: typing.Set[int] = set()
+        
+        for node, class_src in zip(self._aut_nodes, cur_table):
+            if class_src in linked:
+                continue
+            linked.add(class_src)
             
-            result.link(class_src, class_dst, edge.label)
+            for edge in node.out:
+                result.link(class_src, cur_table[self.node_idx(edge.dst)], edge.label)
         
         return result
 
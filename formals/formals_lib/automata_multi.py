@@ -0,0 +1,151 @@
+from __future__ import annotations
+import typing
+import mmap
+
+from .automata import *
+from .automata_ops import *
+from .automata_determ import MakeDeterministic
+from .automata_minimize import AutomataMinimizer
+from .automata_match import DFAMatcher
+from .regex import Regex
+from .regex_automata import regex_to_automata
+
+
+TagsType = typing.FrozenSet[int]
+
+
+class AutomataTaggedUnion(BaseAutomataNaryOp):
+    """
+    Unites epsilon-free automatas without an epsilon edge per input: the new start
+    takes over the edges of all the old ones. The terms are tagged with the indices
+    of the automatas they came from, see self.tags
+    """
+
+    tags: typing.Dict[KeyType, TagsType]
+
+
+    def __init__(self, *auts: Automata):
+        super().__init__(*auts)
+
+        self.tags = {}
+
+    def apply(self) -> Automata:
+        result: Automata = self.raw_merge()
+
+        start_tags: typing.Set[int] = set()
+
+        for i, aut in enumerate(self.auts):
+            assert all(len(edge) > 0 for edge in aut.get_edges()), "Expected an epsilon-free automata"
+
+            for node in aut.get_terms():
+                self.merged(i, node).is_term = True
+                self.tags[self.merged(i, node).key] = frozenset([i])
+
+            for edge in aut.start.out:
+                result.link(result.start, self.merged(i, edge.dst), edge.label)
+
+            if aut.start.is_term:
+                start_tags.add(i)
+
+        result.start.is_term = bool(start_tags)
+        self.tags[result.start.key] = frozenset(start_tags)
+
+        return result
+
+
+class TaggedMinimizer(AutomataMinimizer):
+    """
+    Never merges nodes with different tags, so the result still tells
+    which of the patterns have matched
+    """
+
+    _tags: typing.Mapping[KeyType, TagsType]
+
+
+    def __init__(self, aut: Automata, tags: typing.Mapping[KeyType, TagsType]):
+        # Has to be set before the initial classes are computed
+        self._tags = tags
+
+        super().__init__(aut)
+
+    def initial_class(self, node: Node) -> TagsType:
+        return self._tags.get(node.key, frozenset())
+
+    def result_tags(self) -> typing.Dict[KeyType, TagsType]:
+        """
+        The tags of the nodes of the result of apply()
+        """
+
+        return {
+            class_i: self.initial_class(node)
+            for node, class_i in zip(self._aut_nodes, self.cur_table)
+        }
+
+
+class PatternSet:
+    """
+    A single DFA for several patterns, whose states are tagged with the ids
+    (indices) of the patterns matching the words leading to them.
+    So a single pass over the input tells all the patterns that match it
+    """
+
+    patterns: typing.Tuple[Regex | str, ...]
+    aut: Automata
+    tags: typing.Dict[KeyType, TagsType]
+    _matcher: DFAMatcher
+    _state_tags: typing.List[TagsType]
+
+
+    def __init__(self, patterns: typing.Sequence[Regex | str], aut: Automata, tags: typing.Mapping[KeyType, TagsType]):
+        self.patterns = tuple(patterns)
+        self.aut = aut
+        self.tags = dict(tags)
+
+        self._matcher = DFAMatcher(aut)
+        self._state_tags = [self.tags.get(key, frozenset()) for key in self._matcher.keys]
+
+    def __len__(self) -> int:
+        return len(self.patterns)
+
+    def match(self, word: str) -> TagsType:
+        state: int = self._matcher.run(word)
+
+        return self._state_tags[state] if state >= 0 else frozenset()
+
+    def match_bytes(self, data: bytes | bytearray | memoryview | mmap.mmap) -> TagsType:
+        state: int = self._matcher.run_bytes(data)
+
+        return self._state_tags[state] if state >= 0 else frozenset()
+
+
+def compile_set(patterns: typing.Iterable[Regex | str], alphabet: str | None = None,
+                minimal: bool = True) -> PatternSet:
+    patterns = list(patterns)
+
+    # Position automatas are epsilon-free, which the union relies upon
+    auts: typing.List[Automata] = [
+        regex_to_automata(pattern, alphabet=alphabet, method="glushkov")
+        for pattern in patterns
+    ]
+
+    union = AutomataTaggedUnion(*auts)
+    nfa: Automata = union.apply()
+
+    # Running the subset construction directly, so that the keys are always the subsets
+    dfa: Automata = MakeDeterministic(nfa).subset_construction()
+    tags: typing.Dict[KeyType, TagsType] = {
+        node.key: frozenset().union(*(union.tags.get(key, ()) for key in node.key))
+        for node in dfa.get_nodes()
+    }
+
+    if minimal:
+        minimizer = TaggedMinimizer(dfa, tags)
+        dfa = minimizer.apply()
+        tags = minimizer.result_tags()
+
+    return PatternSet(patterns, dfa, tags)
+
+
+__all__ = [
+    "PatternSet", "compile_set",
+]
@@ -1,89 +1,88 @@
 from __future__ import annotations
 import typing
+from collections import deque
 
 from .automata import *
+from .charclass import CharClass
 
 
-class BaseAutomataBinOp:
-    auts: typing.Tuple[Automata, Automata]
+class BaseAutomataNaryOp:
+    auts: typing.Tuple[Automata, ...]
+    provenance: typing.Dict[KeyType, typing.Tuple[KeyType, KeyType]] | None
+    _node_maps: typing.List[typing.Dict[Node, Node]]
 
 
-    def __init__(self, aut1: Automata, aut2: Automata):
-        self.auts = (aut1, aut2)
-    
-    @property
-    def aut1(self) -> Automata:
-        return self.auts[0]
-    
-    @property
-    def aut2(self) -> Automata:
-        return self.auts[1]
+    def __init__(self, *auts: Automata, keep_provenance: bool = False):
+        """
+        If keep_provenance is True, self.provenance will map the keys of the result
+        back to where they came from: see raw_merge and AutomataIntersect for details
+        """
+
+        self.auts = auts
+        self.provenance = {} if keep_provenance else None
+        self._node_maps = []
     
     def apply(self) -> Automata:
         raise NotImplementedError()
     
     def common_alphabet(self) -> str:
-        return ''.join(set(self.aut1.alphabet) | set(self.aut2.alphabet))
+        # A dict preserves the order, unlike a set
+        return ''.join(dict.fromkeys(''.join(aut.alphabet for aut in self.auts)))
     
-    def raw_merge(self) -> Automata:
+    def merged(self, i: int, node: Node) -> Node:
         """
-        Merges aut1 and aut2, removing term markers and introducing a new, unconnected starting node.
-        The keys are created as tuples of (aut.id, node.key), aut.id being 0 or 1
+        Returns the node of the raw_merge result, which corresponds to node of the i-th automata
         """
 
-        result = Automata(self.common_alphabet())
-        
-        for i in range(2):
-            for node in self.auts[i].get_nodes():
-                result.make_node(key=(i, node.key))
-
-            for edge in self.auts[i].get_edges():
-                result.link(
-                    (i, edge.src.key),
-                    (i, edge.dst.key),
-                    edge.label
-                )
-        
-        return result
+        return self._node_maps[i][node]
+    
+    def _remember(self, key: KeyType, origin: typing.Tuple[KeyType, KeyType]) -> None:
+        if self.provenance is not None:
+            self.provenance[key] = origin
     
-    def raw_cross(self) -> Automata:
+    def raw_merge(self) -> Automata:
         """
-        Makes the cross product of aut1 and aut2,
-        using the (0, 0) node as the starting one and
-        marking only those nodes as term, which are term in both automatas
-        The keys are created as tuples of (node1.key, node2.key)
+        Merges all the automatas in one pass, removing term markers and introducing a new,
+        unconnected starting node. The nodes get fresh flat int keys, so that they don't nest
+        with each op applied. Use merged() to find the counterparts of the original nodes.
+        The provenance maps the keys to tuples of (aut.id, node.key), aut.id being the index in auts
         """
 
         result = Automata(self.common_alphabet())
-
-        result.change_key(result.start, (0, 0))
-        
-        for node1 in self.aut1.get_nodes():
-            for node2 in self.aut2.get_nodes():
-                result.make_node(
-                    key=(node1.key, node2.key),
-                    term=node1.is_term and node2.is_term
-                )
-        
-        for edge1 in self.aut1.get_edges():
-            for node2 in self.aut2.get_nodes():
-                result.link(
-                    (edge1.src.key, node2.key),
-                    (edge1.dst.key, node2.key),
-                    edge1.label
-                )
+        self._node_maps = []
         
-        for node1 in self.aut1.get_nodes():
-            for edge2 in self.aut2.get_edges():
-                result.link(
-                    (node1.key, edge2.src.key),
-                    (node1.key, edge2.dst.key),
-                    edge2.label
-                )
+        for i, aut in enumerate(self.auts):
+            node_map: typing.Dict[Node, Node] = {}
+
+            for node in aut.get_nodes():
+                new_node: Node = result.make_node()
+                node_map[node] = new_node
+                self._remember(new_node.key, (i, node.key))
+
+            for edge in aut.get_edges():
+                result.link(node_map[edge.src], node_map[edge.dst], edge.label)
+            
+            self._node_maps.append(node_map)
         
         return result
 
 
+class BaseAutomataBinOp(BaseAutomataNaryOp):
+    auts: typing.Tuple[Automata, Automata]
+
+
+    def __init__(self, aut1: Automata, aut2: Automata, keep_provenance: bool = False):
+        super().__init__(aut1, aut2, keep_provenance=keep_provenance)
+    
+    @property
+    def aut1(self) -> Automata:
+        return self.auts[0]
+    
+    @property
+    def aut2(self) -> Automata:
+        return self.auts[1]
+
+
 class BaseAutomataTransform:
     aut: Automata
 
@@ -91,7 +90,12 @@ class BaseAutomataTransform:
     def __init__(self, aut: Automata):
         self.aut = aut
     
-    def apply(self) -> Automata:
+    def apply(self, inplace: bool = False) -> Automata:
+        """
+        If inplace is True, the transform is allowed to mutate (and return) self.aut
+        instead of working on a copy. Only use it if the automata is yours to spoil
+        """
+
         raise NotImplementedError()
     
     def raw_copy(self) -> Automata:
@@ -100,53 +104,64 @@ class BaseAutomataTransform:
         """
 
         return self.aut.copy()
+    
+    def raw_target(self, inplace: bool = False) -> Automata:
+        """
+        Returns the automata to be modified: either self.aut itself, or its copy
+        """
+
+        if inplace:
+            return self.aut
+        
+        return self.raw_copy()
 
 
 # End of base classes, begin specific optimizations
 
-class AutomataConcat(BaseAutomataBinOp):
+class AutomataConcat(BaseAutomataNaryOp):
     def apply(self) -> Automata:
         result: Automata = self.raw_merge()
 
-        result.link(result.start, (0, self.aut1.start.key), "")
+        if not self.auts:
+            result.start.is_term = True
+            return result
+
+        result.link(result.start, self.merged(0, self.auts[0].start), "")
+
+        for i in range(len(self.auts) - 1):
+            next_start: Node = self.merged(i + 1, self.auts[i + 1].start)
 
-        for node in self.aut1.get_terms():
-            result.link((0, node.key), (1, self.aut2.start.key), "")
+            for node in self.auts[i].get_terms():
+                result.link(self.merged(i, node), next_start, "")
         
-        for node in self.aut2.get_terms():
-            result.node((1, node.key)).is_term = True
+        for node in self.auts[-1].get_terms():
+            self.merged(len(self.auts) - 1, node).is_term = True
         
         return result
 
 
-class AutomataJoin(BaseAutomataBinOp):
+class AutomataJoin(BaseAutomataNaryOp):
     def apply(self) -> Automata:
         result: Automata = self.raw_merge()
 
-        for i in range(2):
-            result.link(result.start, (i, self.auts[i].start.key), "")
-
-        end: Node = result.make_node(term=True)
-
-        for i in range(2):
-            for node in self.auts[i].get_terms():
-                result.link((i, node.key), end, "")
-        
-        return result
+        if not self.auts:
+            return result
 
+        for i, aut in enumerate(self.auts):
+            result.link(result.start, self.merged(i, aut.start), "")
 
-class AutomataIntersect(BaseAutomataBinOp):
-    def apply(self) -> Automata:
-        result: Automata = self.raw_cross()
+        end: Node = result.make_node(term=True)
 
-        # No more work needed, actually
+        for i, aut in enumerate(self.auts):
+            for node in aut.get_terms():
+                result.link(self.merged(i, node), end, "")
         
         return result
 
 
 class AutomataStar(BaseAutomataTransform):
-    def apply(self) -> Automata:
-        result: Automata = self.raw_copy()
+    def apply(self, inplace: bool = False) -> Automata:
+        result: Automata = self.raw_target(inplace)
 
         new_start: Node = result.make_node(term=True)
         result.link(new_start, result.start, "")
@@ -162,8 +177,8 @@ class AutomataStar(BaseAutomataTransform):
 
 
 class AutomataPlusPow(BaseAutomataTransform):
-    def apply(self) -> Automata:
-        result: Automata = self.raw_copy()
+    def apply(self, inplace: bool = False) -> Automata:
+        result: Automata = self.raw_target(inplace)
 
         new_start: Node = result.make_node()
         result.link(new_start, result.start, "")
@@ -178,50 +193,151 @@ class AutomataPlusPow(BaseAutomataTransform):
 
 
 class AutomataTrimmer(BaseAutomataTransform):
-    def apply(self) -> Automata:
-        result: Automata = self.raw_copy()
+    coaccessible: bool
+
+
+    def __init__(self, aut: Automata, coaccessible: bool = False):
+        """
+        If coaccessible is True, the nodes from which no term node
+        can be reached are removed as well (except for the start)
+        """
+
+        super().__init__(aut)
+
+        self.coaccessible = coaccessible
+    
+    def apply(self, inplace: bool = False) -> Automata:
+        result: Automata = self.raw_target(inplace)
 
         vis = AutomataVisitor()
         vis.visit(result)
 
+        coaccessible: typing.Set[Node] | None = None
+        if self.coaccessible:
+            coaccessible = self.find_coaccessible(result)
+
         to_remove: typing.List[Node] = []
         for node in result.get_nodes():
-            if not vis.was_seen(node):
+            if node is result.start:
+                continue
+            
+            if not vis.was_seen(node) or (coaccessible is not None and node not in coaccessible):
                 to_remove.append(node)
         
         result.remove_nodes(to_remove)
 
         return result
+    
+    @staticmethod
+    def find_coaccessible(aut: Automata) -> typing.Set[Node]:
+        in_edges: typing.Dict[Node, typing.List[Edge]] = aut.get_in_edges()
+
+        seen: typing.Set[Node] = set()
+        queue: typing.Deque[Node] = deque(aut.get_terms())
+
+        while queue:
+            node: Node = queue.popleft()
+
+            if node in seen:
+                continue
+            seen.add(node)
+
+            for edge in in_edges.get(node, ()):
+                queue.append(edge.src)
+        
+        return seen
+
+
+class AutomataReverse(BaseAutomataTransform):
+    """
+    Builds the automata of the reversed words: every edge is flipped (and its label
+    reversed, if it's a long one), the old terms are reached from a fresh start by
+    epsilon edges, and the old start becomes the only term. The node keys are kept,
+    and the whole thing takes O(|V| + |E|)
+    """
+
+    def apply(self, inplace: bool = False) -> Automata:
+        result: Automata = self.raw_target(inplace)
+
+        in_edges: typing.Dict[Node, typing.List[Edge]] = result.get_in_edges()
+        old_start: Node = result.start
+        old_terms: typing.List[Node] = list(result.get_terms())
+
+        result.unlink_many(list(result.get_edges()))
+
+        for node, edges in in_edges.items():
+            for edge in edges:
+                result.link(node, edge.src, self.reverse_label(edge.label))
+
+        for node in old_terms:
+            node.is_term = False
+
+        new_start: Node = result.make_node()
+        result.set_start(new_start)
+        old_start.is_term = True
+
+        for node in old_terms:
+            result.link(new_start, node, "")
+
+        return result
+
+    @staticmethod
+    def reverse_label(label: str | CharClass) -> str | CharClass:
+        if isinstance(label, str):
+            return label[::-1]
+
+        return label
 
 
 def aut_concat(aut1: Automata, aut2: Automata) -> Automata:
     return AutomataConcat(aut1, aut2).apply()
 
 
+def aut_concat_many(auts: typing.Iterable[Automata]) -> Automata:
+    return AutomataConcat(*auts).apply()
+
+
 def aut_join(aut1: Automata, aut2: Automata) -> Automata:
     return AutomataJoin(aut1, aut2).apply()
 
 
-def aut_intersect(aut1: Automata, aut2: Automata) -> Automata:
-    return AutomataIntersect(aut1, aut2).apply()
+def aut_join_many(auts: typing.Iterable[Automata]) -> Automata:
+    return AutomataJoin(*auts).apply()
 
 
-def aut_star(aut: Automata) -> Automata:
-    return AutomataStar(aut).apply()
+def aut_star(aut: Automata, inplace: bool = False) -> Automata:
+    return AutomataStar(aut).apply(inplace)
 
 
-def aut_pow_plus(aut: Automata) -> Automata:
-    return AutomataPlusPow(aut).apply()
+def aut_pow_plus(aut: Automata, inplace: bool = False) -> Automata:
+    return AutomataPlusPow(aut).apply(inplace)
 
 
-def aut_trim(aut: Automata) -> Automata:
-    return AutomataTrimmer(aut).apply()
+def aut_reverse(aut: Automata, inplace: bool = False) -> Automata:
+    return AutomataReverse(aut).apply(inplace)
+
+
+def aut_trim(aut: Automata, coaccessible: bool = False, inplace: bool = False) -> Automata:
+    return AutomataTrimmer(aut, coaccessible=coaccessible).apply(inplace)
 
 
 # AutomataComplement and complement() are implemented in a separate file, since they rely on make_full_dfa()
+# The same goes for AutomataIntersect and aut_intersect(), which rely on make_edges_1()
+
+
+def __getattr__(name: str) -> typing.Any:
+    # aut_intersect used to live here, so it's still importable from this module. Lazily,
+    # since automata_intersect depends on automata_determ, which depends on this module
+    if name in ("AutomataIntersect", "aut_intersect"):
+        from . import automata_intersect
+
+        return getattr(automata_intersect, name)
+
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
 __all__ = [
-    "BaseAutomataBinOp", "BaseAutomataTransform",
-    "aut_concat", "aut_join", "aut_intersect", "aut_star", "aut_pow_plus", "aut_trim",
+    "BaseAutomataNaryOp", "BaseAutomataBinOp", "BaseAutomataTransform",
+    "aut_concat", "aut_concat_many", "aut_join", "aut_join_many", "aut_star", "aut_pow_plus", "aut_trim",
+    "aut_reverse",
 ]
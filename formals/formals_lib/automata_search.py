@@ -0,0 +1,192 @@
+from __future__ import annotations
+import typing
+
+from .automata import *
+from .automata_ops import aut_reverse
+from .automata_determ import make_edges_1
+from .automata_match import DFAMatcher
+from .charclass import CharClass
+
+
+SpanType = typing.Tuple[int, int]
+
+
+def _prefix_any(aut: Automata) -> Automata:
+    """
+    The automata of Σ*L, where Σ is any letter at all. The loop is put on a fresh
+    start, since the old one may have incoming edges. Expects an epsilon-free automata
+    """
+
+    result: Automata = aut.copy()
+    old_start: Node = result.start
+
+    result.set_start(result.make_node(term=old_start.is_term))
+    result.link(result.start, result.start, ~CharClass())
+
+    for edge in list(old_start.out):
+        result.link(result.start, edge.dst, edge.label)
+
+    return result
+
+
+class AutomataSearcher:
+    """
+    Finds the occurrences of the automata's words in a text. Three DFAs are compiled:
+    Σ*L and L for the forward direction, and Σ*L^R for the backward one.
+    The spans are (start, end) pairs, as for slicing
+    """
+
+    _forward: DFAMatcher
+    _forward_scan: DFAMatcher
+    _backward_scan: DFAMatcher
+
+
+    def __init__(self, aut: Automata):
+        aut = make_edges_1(aut)
+        reversed_aut: Automata = make_edges_1(aut_reverse(aut), inplace=True)
+
+        self._forward = DFAMatcher(aut)
+        self._forward_scan = DFAMatcher(_prefix_any(aut))
+        self._backward_scan = DFAMatcher(_prefix_any(reversed_aut))
+
+    @staticmethod
+    def _farthest(matcher: DFAMatcher, letters: typing.Iterable[str], pos: int, step: int) -> int | None:
+        """
+        Feeds the letters to the matcher, moving pos by step for each one, until the
+        dead state is reached. Returns the last pos at which the state was terminal
+        """
+
+        state: int = matcher.start
+        result: int | None = pos if matcher.terms[state] else None
+
+        for letter in letters:
+            class_id: int | None = matcher.classes.class_of(letter)
+            if class_id is None:
+                break
+
+            state = matcher.transitions[state][class_id]
+            if state < 0:
+                break
+
+            pos += step
+            if matcher.terms[state]:
+                result = pos
+
+        return result
+
+    @staticmethod
+    def _scan(matcher: DFAMatcher, letters: typing.Iterable[str]) -> typing.Generator[bool, None, None]:
+        """
+        Yields whether the state is terminal, before and after each letter.
+        The matcher is expected to never die, as the Σ* ones don't
+        """
+
+        class_of: typing.Callable[[str], int | None] = matcher.classes.class_of
+        transitions: typing.List[typing.List[int]] = matcher.transitions
+        terms: typing.List[bool] = matcher.terms
+        state: int = matcher.start
+
+        yield terms[state]
+
+        for letter in letters:
+            state = transitions[state][class_of(letter)]
+
+            yield terms[state]
+
+    def ends(self, text: str) -> typing.Generator[int, None, None]:
+        """
+        All the positions where some match ends, found in a single forward pass
+        """
+
+        for pos, is_term in enumerate(self._scan(self._forward_scan, text)):
+            if is_term:
+                yield pos
+
+    def starts(self, text: str) -> typing.List[bool]:
+        """
+        For every position, whether some match starts there, found in a single backward pass
+        """
+
+        result: typing.List[bool] = list(self._scan(self._backward_scan, reversed(text)))
+        result.reverse()
+
+        return result
+
+    def finditer(self, text: str, overlapping: bool = False) -> typing.Generator[SpanType, None, None]:
+        """
+        If overlapping is False, the matches are leftmost-longest and don't overlap:
+        the leftmost start is taken, then the longest match from it, and the search
+        continues from its end (or from the next position, if the match was empty).
+        If overlapping is True, every end of a match is reported, with the leftmost start for it
+        """
+
+        if overlapping:
+            yield from self._leftmost_per_end(text)
+            return
+
+        starts: typing.List[bool] = self.starts(text)
+        pos: int = 0
+
+        while pos <= len(text):
+            if not starts[pos]:
+                pos += 1
+                continue
+
+            end: int | None = self._farthest(self._forward, (text[i] for i in range(pos, len(text))), pos, 1)
+            assert end is not None
+
+            yield pos, end
+
+            pos = end if end > pos else pos + 1
+
+    def _leftmost_per_end(self, text: str) -> typing.Generator[SpanType, None, None]:
+        """
+        Runs L from every position at once, in a single forward pass. Runs meeting
+        in the same state go on identically, so only the leftmost start is kept per state,
+        which makes it O(len(text) * |Q|)
+        """
+
+        class_of: typing.Callable[[str], int | None] = self._forward.classes.class_of
+        transitions: typing.List[typing.List[int]] = self._forward.transitions
+        terms: typing.List[bool] = self._forward.terms
+        start_state: int = self._forward.start
+
+        # state -> the leftmost start of the runs in it. Filled in the order of
+        # the starts, so the first term state met has the leftmost start
+        runs: typing.Dict[int, int] = {start_state: 0}
+
+        for pos in range(len(text) + 1):
+            if pos > 0:
+                class_id: int | None = class_of(text[pos - 1])
+                next_runs: typing.Dict[int, int] = {}
+
+                if class_id is not None:
+                    for state, start in runs.items():
+                        target: int = transitions[state][class_id]
+
+                        if target >= 0 and target not in next_runs:
+                            next_runs[target] = start
+
+                next_runs.setdefault(start_state, pos)
+                runs = next_runs
+
+            for state, start in runs.items():
+                if terms[state]:
+                    yield start, pos
+                    break
+
+    def search(self, text: str) -> SpanType | None:
+        return next(self.finditer(text), None)
+
+
+def finditer(aut: Automata, text: str, overlapping: bool = False) -> typing.Generator[SpanType, None, None]:
+    return AutomataSearcher(aut).finditer(text, overlapping=overlapping)
+
+
+def search(aut: Automata, text: str) -> SpanType | None:
+    return AutomataSearcher(aut).search(text)
+
+
+__all__ = [
+    "AutomataSearcher", "finditer", "search",
+]
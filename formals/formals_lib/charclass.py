@@ -0,0 +1,216 @@
+from __future__ import annotations
+import typing
+import dataclasses
+import bisect
+import itertools
+
+
+_MAX_CODE: typing.Final[int] = 0x10FFFF
+
+# Have to be escaped when printed inside of a class
+_SPECIAL: typing.Final[str] = "\\[]-^"
+
+
+@dataclasses.dataclass(frozen=True, repr=False)
+class CharClass:
+    """
+    A set of characters, stored as sorted ranges of code points (both ends inclusive).
+    The ranges are kept disjoint and non-adjacent, so equal sets always compare
+    (and hash) equal. Used both as the CharSet regex node's payload and as an automata
+    edge label, in which case it stands for a single letter out of the set
+    """
+
+    ranges: typing.Tuple[typing.Tuple[int, int], ...] = ()
+
+    def __post_init__(self):
+        object.__setattr__(self, "ranges", self._normalize(self.ranges))
+
+    @staticmethod
+    def _normalize(ranges: typing.Iterable[typing.Tuple[int, int]]) -> typing.Tuple[typing.Tuple[int, int], ...]:
+        result: typing.List[typing.Tuple[int, int]] = []
+
+        for lo, hi in sorted(ranges):
+            assert 0 <= lo <= hi <= _MAX_CODE, f"Invalid range: {lo}-{hi}"
+
+            if result and lo <= result[-1][1] + 1:
+                result[-1] = (result[-1][0], max(result[-1][1], hi))
+            else:
+                result.append((lo, hi))
+
+        return tuple(result)
+
+    @classmethod
+    def from_letters(cls, letters: typing.Iterable[str]) -> CharClass:
+        return cls(tuple((ord(letter), ord(letter)) for letter in letters))
+
+    @classmethod
+    def from_ranges(cls, ranges: typing.Iterable[typing.Tuple[str, str]]) -> CharClass:
+        return cls(tuple((ord(lo), ord(hi)) for lo, hi in ranges))
+
+    @classmethod
+    def of(cls, label: str | CharClass) -> CharClass:
+        """
+        Converts an edge label (a single letter or a class) to a class
+        """
+
+        if isinstance(label, CharClass):
+            return label
+
+        assert len(label) == 1, "Only single letter labels can be converted to classes"
+        return cls.from_letters(label)
+
+    @staticmethod
+    def union_of(classes: typing.Iterable[CharClass]) -> CharClass:
+        return CharClass(tuple(itertools.chain.from_iterable(cls.ranges for cls in classes)))
+
+    @staticmethod
+    def split(classes: typing.Sequence[CharClass]) -> typing.List[typing.Tuple[CharClass, typing.FrozenSet[int]]]:
+        """
+        Splits the union of classes into disjoint pieces, each paired with the indices
+        of the classes that contain it. Pieces contained in the same classes are merged.
+        Takes O(R log R) for R ranges in total, regardless of the amount of letters
+        """
+
+        # (code point, class index, whether the range starts there)
+        events: typing.List[typing.Tuple[int, int, bool]] = []
+
+        for i, cls in enumerate(classes):
+            for lo, hi in cls.ranges:
+                events.append((lo, i, True))
+                events.append((hi + 1, i, False))
+
+        events.sort()
+
+        pieces: typing.Dict[typing.FrozenSet[int], typing.List[typing.Tuple[int, int]]] = {}
+        active: typing.Set[int] = set()
+        prev: int | None = None
+
+        for point, group in itertools.groupby(events, key=lambda event: event[0]):
+            if active:
+                pieces.setdefault(frozenset(active), []).append((prev, point - 1))
+
+            for _, i, is_start in group:
+                if is_start:
+                    active.add(i)
+                else:
+                    active.discard(i)
+
+            prev = point
+
+        return [(CharClass(tuple(ranges)), members) for members, ranges in pieces.items()]
+
+    def __contains__(self, letter: str) -> bool:
+        if len(letter) != 1:
+            return False
+
+        code: int = ord(letter)
+        i: int = bisect.bisect_right(self.ranges, (code, _MAX_CODE + 1))
+
+        return i > 0 and self.ranges[i - 1][1] >= code
+
+    def __len__(self) -> int:
+        return sum(hi - lo + 1 for lo, hi in self.ranges)
+
+    def __bool__(self) -> bool:
+        return bool(self.ranges)
+
+    def __iter__(self) -> typing.Iterator[str]:
+        for lo, hi in self.ranges:
+            for code in range(lo, hi + 1):
+                yield chr(code)
+
+    def letters(self) -> str:
+        return ''.join(self)
+
+    def single(self) -> str | None:
+        """
+        The only letter of the class, if there's exactly one
+        """
+
+        if len(self.ranges) == 1 and self.ranges[0][0] == self.ranges[0][1]:
+            return chr(self.ranges[0][0])
+
+        return None
+
+    def as_label(self) -> str | CharClass:
+        """
+        Single letter classes are labelled with just the letter
+        """
+
+        letter: str | None = self.single()
+
+        return self if letter is None else letter
+
+    def isdisjoint(self, other: CharClass) -> bool:
+        return not (self & other)
+
+    def __or__(self, other: CharClass) -> CharClass:
+        if not isinstance(other, CharClass):
+            return NotImplemented
+        return CharClass(self.ranges + other.ranges)
+
+    def __and__(self, other: CharClass) -> CharClass:
+        if not isinstance(other, CharClass):
+            return NotImplemented
+
+        result: typing.List[typing.Tuple[int, int]] = []
+        i: int = 0
+        j: int = 0
+
+        while i < len(self.ranges) and j < len(other.ranges):
+            lo: int = max(self.ranges[i][0], other.ranges[j][0])
+            hi: int = min(self.ranges[i][1], other.ranges[j][1])
+
+            if lo <= hi:
+                result.append((lo, hi))
+
+            if self.ranges[i][1] < other.ranges[j][1]:
+                i += 1
+            else:
+                j += 1
+
+        return CharClass(tuple(result))
+
+    def __invert__(self) -> CharClass:
+        result: typing.List[typing.Tuple[int, int]] = []
+        start: int = 0
+
+        for lo, hi in self.ranges:
+            if lo > start:
+                result.append((start, lo - 1))
+            start = hi + 1
+
+        if start <= _MAX_CODE:
+            result.append((start, _MAX_CODE))
+
+        return CharClass(tuple(result))
+
+    def __sub__(self, other: CharClass) -> CharClass:
+        if not isinstance(other, CharClass):
+            return NotImplemented
+        return self & ~other
+
+    @staticmethod
+    def _escape(code: int) -> str:
+        letter: str = chr(code)
+
+        return "\\" + letter if letter in _SPECIAL else letter
+
+    def __str__(self) -> str:
+        parts: typing.List[str] = []
+
+        for lo, hi in self.ranges:
+            if hi - lo >= 2:
+                parts.append(f"{self._escape(lo)}-{self._escape(hi)}")
+            else:
+                parts.extend(self._escape(code) for code in range(lo, hi + 1))
+
+        return f"[{''.join(parts)}]"
+
+    def __repr__(self) -> str:
+        return f"CharClass({str(self)!r})"
+
+
+__all__ = [
+    "CharClass",
+]
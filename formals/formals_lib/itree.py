@@ -2,6 +2,7 @@ from __future__ import annotations
 import typing
 import abc
 import warnings
+import inspect
 
 
 T = typing.TypeVar("T", bound="ITree")
@@ -17,6 +18,8 @@ class TreeVisitor(typing.Generic[T]):
     warn_on_generic: typing.ClassVar[bool] = False
 
     _lookup: typing.ClassVar[typing.Mapping[typing.Type[T], typing.Callable[["TreeVisitor", T]]]]
+    # Concrete node type -> resolved handler, filled lazily
+    _handler_cache: typing.ClassVar[typing.Dict[typing.Type[T], typing.Callable[["TreeVisitor", T]]]] = {}
     
     @staticmethod
     def handler(node_type: typing.Type[T]):
@@ -36,6 +39,7 @@ class TreeVisitor(typing.Generic[T]):
         super().__init_subclass__(**kwargs)
         
         cls._lookup = {}
+        cls._handler_cache = {}
         
         for member in cls.__dict__.values():
             if not hasattr(member, "_visits_"):
@@ -50,22 +54,121 @@ class TreeVisitor(typing.Generic[T]):
         pass
 
     def visit(self, node: T) -> typing.Any:
-        for base in type(node).__mro__:
-            if base in self._lookup:
-                return self._lookup[base](self, node)
-        
+        """
+        Handlers may either return the result right away, or be generators. A generator
+        handler yields the children it needs visited and receives their results back
+        (as in `result = yield child`), returning its own result in the end.
+        Such handlers are driven with an explicit stack instead of Python recursion,
+        so arbitrarily deep trees are fine. Note that this means that a handler
+        can't return a generator as its actual result
+        """
+
+        result: typing.Any = self._begin(node)
+
+        if not inspect.isgenerator(result):
+            return result
+
+        stack: typing.List[typing.Tuple[T, typing.Generator[T, typing.Any, typing.Any]]] = [(node, result)]
+        result = None
+
+        while stack:
+            cur_node, handler = stack[-1]
+
+            try:
+                child: T = handler.send(result)
+            except StopIteration as e:
+                stack.pop()
+                result = self._finish(cur_node, e.value)
+                continue
+
+            result = self._begin(child)
+
+            if inspect.isgenerator(result):
+                stack.append((child, result))
+                result = None
+
+        return result
+
+    def _begin(self, node: T) -> typing.Any:
+        """
+        Returns either the result for the node, or a generator that will produce it
+        """
+
+        return self._dispatch(node)
+
+    def _finish(self, node: T, result: typing.Any) -> typing.Any:
+        """
+        Called once a generator handler has produced the node's result
+        """
+
+        return result
+
+    def _dispatch(self, node: T) -> typing.Any:
+        handler: typing.Callable[[TreeVisitor, T]] | None = self._handler_cache.get(type(node))
+
+        if handler is None:
+            handler = self._resolve_handler(type(node))
+            self._handler_cache[type(node)] = handler
+
+        return handler(self, node)
+
+    @classmethod
+    def _resolve_handler(cls, node_type: typing.Type[T]) -> typing.Callable[["TreeVisitor", T]]:
+        for base in node_type.__mro__:
+            if base in cls._lookup:
+                return cls._lookup[base]
+
+        return cls._visit_generic
+
+    def _visit_generic(self, node: T) -> typing.Any:
         if self.warn_on_generic:
             warnings.warn(f"Handler for {type(node).__qualname__} not specified, defaulting to iterating over children")
             assert False, "Comment this out if you don't want to be THIS pedantic"
 
         return self.generic_visit(node)
     
-    def generic_visit(self, node: T) -> None:
+    def generic_visit(self, node: T) -> typing.Generator[T, typing.Any, None]:
         for child in node.get_children():
-            self.visit(child)
+            yield child
+
+
+class MemoTreeVisitor(TreeVisitor[T]):
+    """
+    Caches the results per node identity, so that subtrees shared in a DAG
+    are only visited once. Only fit for visitors whose results depend on
+    nothing but the subtree itself, and which don't modify the results afterwards
+    """
+
+    # The node is stored along with the result, to keep its id from being reused
+    _memo: typing.Dict[int, typing.Tuple[T, typing.Any]]
+
+
+    def __init__(self):
+        super().__init__()
+
+        self._memo = {}
+
+    def _begin(self, node: T) -> typing.Any:
+        entry: typing.Tuple[T, typing.Any] | None = self._memo.get(id(node))
+
+        if entry is not None:
+            return entry[1]
+
+        result: typing.Any = super()._begin(node)
+
+        if not inspect.isgenerator(result):
+            self._memo[id(node)] = (node, result)
+
+        return result
+
+    def _finish(self, node: T, result: typing.Any) -> typing.Any:
+        result = super()._finish(node, result)
+        self._memo[id(node)] = (node, result)
+
+        return result
 
 
 
 __all__ = [
-    "ITree", "TreeVisitor",
+    "ITree", "TreeVisitor", "MemoTreeVisitor",
 ]
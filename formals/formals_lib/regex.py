@@ -1,14 +1,73 @@
 from __future__ import annotations
 import typing
+import itertools
+import abc
 import enum
 import contextlib
 import dataclasses
+import weakref
+import inspect
 
 from . import itree
+from .charclass import CharClass
 
 
-@dataclasses.dataclass(frozen=True)
-class Regex(itree.ITree["Regex"]):
+class _InterningMeta(abc.ABCMeta):
+    """
+    Makes the construction of Regex'es go through a cache, so that
+    structurally equal regexes are always the same object
+    """
+
+    _signatures: typing.ClassVar[typing.Dict[type, inspect.Signature]] = {}
+
+
+    def __call__(cls, *args, **kwargs):
+        if kwargs:
+            args = cls._bind_positionally(args, kwargs)
+
+        # The children are interned already, so hashing them here is O(1) each
+        key: typing.Tuple = (cls, args)
+
+        result: Regex | None = _interned.get(key)
+
+        if result is None:
+            result = super().__call__(*args)
+            object.__setattr__(result, "_args", args)
+            object.__setattr__(result, "_hash", hash(key))
+            # A cheap stable sort key, e.g. for ordering alternatives canonically
+            object.__setattr__(result, "_seq", next(_sequence))
+            _interned[key] = result
+
+        return result
+
+    def _bind_positionally(cls, args: typing.Tuple, kwargs: typing.Dict[str, typing.Any]) -> typing.Tuple:
+        """
+        Turns keyword arguments into positional ones, so that
+        the same regex interns the same however it was constructed
+        """
+
+        signature: inspect.Signature | None = _InterningMeta._signatures.get(cls)
+        if signature is None:
+            signature = _InterningMeta._signatures[cls] = inspect.signature(cls.__init__)
+
+        # The first parameter is self
+        bound: inspect.BoundArguments = signature.bind(None, *args, **kwargs)
+        bound.apply_defaults()
+
+        return bound.args[1:]
+
+
+_interned: weakref.WeakValueDictionary[typing.Tuple, "Regex"] = weakref.WeakValueDictionary()
+_sequence: typing.Iterator[int] = itertools.count()
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
+class Regex(itree.ITree["Regex"], metaclass=_InterningMeta):
+    """
+    Regexes are hash-consed: equality is identity, and the hash is computed once,
+    at construction. Consequently, they may only be created by calling the class
+    """
+
     def __add__(self, other):
         if not isinstance(other, Regex):
             return NotImplemented
@@ -34,7 +93,7 @@ class Regex(itree.ITree["Regex"]):
         return other.__mul__(self)
     
     def repeat(self, n: int) -> Regex:
-        return Concat(*([self] * n))
+        return Repeat(self, n, n)
     
     def __pow__(self, power):
         if isinstance(power, int):
@@ -42,17 +101,23 @@ class Regex(itree.ITree["Regex"]):
         return NotImplemented
     
     def __eq__(self, other) -> bool:
-        if type(self) != type(other):
-            return False
-        
-        for child1, child2 in zip(self.get_children(), other.get_children()):
-            if child1 != child2:
-                return False
-        
-        return True
+        return self is other
+    
+    def __hash__(self) -> int:
+        return self._hash
+    
+    def __reduce__(self):
+        # Goes through the interning again on unpickling
+        return type(self), self._args
+    
+    def __copy__(self) -> Regex:
+        return self
+    
+    def __deepcopy__(self, memo: typing.Dict) -> Regex:
+        return self
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, eq=False)
 class Letter(Regex):
     letter: str
     
@@ -63,9 +128,21 @@ class Letter(Regex):
     
     def get_children(self) -> typing.Iterable[Regex]:
         return ()
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
+class CharSet(Regex):
+    """
+    Any single letter out of the class
+    """
+
+    charclass: CharClass
     
-    def __eq__(self, other) -> bool:
-        return super().__eq__(other) and self.letter == other.letter
+    def __init__(self, charclass: CharClass):
+        object.__setattr__(self, "charclass", charclass)
+    
+    def get_children(self) -> typing.Iterable[Regex]:
+        return ()
 
 
 class Zero(Regex):
@@ -78,7 +155,7 @@ class One(Regex):
         return ()
 
 
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, eq=False)
 class Concat(Regex):
     _children: typing.List[Regex]
     
@@ -89,10 +166,29 @@ class Concat(Regex):
         return tuple(self._children)
 
 
-# TODO: Maybe smart Repeat for optimization?
+@dataclasses.dataclass(frozen=True, eq=False)
+class Repeat(Regex):
+    """
+    The child repeated from min to max times; max being None means unbounded
+    """
 
+    _child: Regex
+    min: int
+    max: int | None
+    
+    def __init__(self, child: Regex, min: int, max: int | None):  #pylint:disable=W0622
+        assert min >= 0
+        assert max is None or max >= min
 
-@dataclasses.dataclass(frozen=True)
+        object.__setattr__(self, "_child", child)
+        object.__setattr__(self, "min", min)
+        object.__setattr__(self, "max", max)
+    
+    def get_children(self) -> typing.Iterable[Regex]:
+        return (self._child,)
+
+
+@dataclasses.dataclass(frozen=True, eq=False)
 class Star(Regex):
     _child: Regex
     
@@ -103,10 +199,7 @@ class Star(Regex):
         return (self._child,)
 
 
-# TODO: Plus (as power)?
-
-
-@dataclasses.dataclass(frozen=True)
+@dataclasses.dataclass(frozen=True, eq=False)
 class Either(Regex):
     _children: typing.List[Regex]
     
@@ -146,6 +239,10 @@ class Reconstructor(itree.TreeVisitor[Regex]):
     def visit_letter(self, node: Letter) -> str:
         return node.letter
     
+    @itree.TreeVisitor.handler(CharSet)
+    def visit_charset(self, node: CharSet) -> str:
+        return str(node.charclass)
+    
     @itree.TreeVisitor.handler(Zero)
     def visit_zero(self, node: Zero) -> str:
         return "0"
@@ -155,12 +252,12 @@ class Reconstructor(itree.TreeVisitor[Regex]):
         return "1"
     
     @itree.TreeVisitor.handler(Concat)
-    def visit_concat(self, node: Concat) -> str:
+    def visit_concat(self, node: Concat) -> typing.Generator[Regex, str, str]:
         result: typing.List[str] = []
 
         with self._set_par_level(self.ParLevel.either):
             for child in node.get_children():
-                result.append(self.visit(child))
+                result.append((yield child))
         
         result: str = "".join(result)
         if self._par_level >= self.ParLevel.concat:
@@ -169,17 +266,32 @@ class Reconstructor(itree.TreeVisitor[Regex]):
         return result
 
     @itree.TreeVisitor.handler(Star)
-    def visit_star(self, node: Star) -> str:
+    def visit_star(self, node: Star) -> typing.Generator[Regex, str, str]:
+        with self._set_par_level(self.ParLevel.concat):
+            return (yield node.get_children()[0]) + "*"
+
+    @itree.TreeVisitor.handler(Repeat)
+    def visit_repeat(self, node: Repeat) -> typing.Generator[Regex, str, str]:
         with self._set_par_level(self.ParLevel.concat):
-            return self.visit(node.get_children()[0]) + "*"
+            return (yield node.get_children()[0]) + self.repeat_suffix(node)
+
+    @staticmethod
+    def repeat_suffix(node: Repeat) -> str:
+        if node.min == node.max:
+            return f"^{node.min}"
+        if node.max is not None:
+            return f"^{{{node.min},{node.max}}}"
+        if node.min == 1:
+            return "^+"
+        return f"^{{{node.min},}}"
 
     @itree.TreeVisitor.handler(Either)
-    def visit_either(self, node: Either) -> str:
+    def visit_either(self, node: Either) -> typing.Generator[Regex, str, str]:
         result: typing.List[str] = []
 
         with self._set_par_level(self.ParLevel.none):
             for child in node.get_children():
-                result.append(self.visit(child))
+                result.append((yield child))
         
         result: str = "+".join(result)
         if self._par_level >= self.ParLevel.either:
@@ -193,6 +305,6 @@ def reconstruct_regex(regex: Regex) -> str:
 
 
 __all__ = [
-    "Regex", "Letter", "Zero", "One", "Concat", "Star", "Either",
+    "Regex", "Letter", "CharSet", "Zero", "One", "Concat", "Repeat", "Star", "Either",
     "reconstruct_regex",
 ]
@@ -7,13 +7,16 @@ import itertools
 from .automata import *
 from .automata_ops import *
 from .regex import *
-from .itree import TreeVisitor
-from .automata_determ import make_edges_1, unify_term
+from .itree import TreeVisitor, MemoTreeVisitor
+from .charclass import CharClass
+from .automata_determ import make_edges_1, unify_term, make_dfa
 from .regex_optimize import optimize_regex
 from .regex_parser import parse_regex
+from .regex_glushkov import regex_to_glushkov
+from .regex_derivatives import regex_to_derivative_dfa, regex_to_antimirov
 
 
-class RegexToAutomataConverter(TreeVisitor[Regex]):
+class RegexToAutomataConverter(MemoTreeVisitor[Regex]):
     warn_on_generic: typing.ClassVar[bool] = True
     
     _alphabet: str | None
@@ -42,6 +45,17 @@ class RegexToAutomataConverter(TreeVisitor[Regex]):
         
         return result
     
+    @TreeVisitor.handler(CharSet)
+    def visit_charset(self, node: CharSet) -> Automata:
+        # A single edge, however wide the class is. The alphabet doesn't list the class'
+        # letters, since the label already covers its ranges
+        result = Automata("")
+        
+        if node.charclass:
+            result.link(result.start, result.make_node(term=True), node.charclass.as_label())
+        
+        return result
+    
     @TreeVisitor.handler(Zero)
     def visit_zero(self, node: Zero) -> Automata:
         result = Automata("")
@@ -57,38 +71,56 @@ class RegexToAutomataConverter(TreeVisitor[Regex]):
         return result
     
     @TreeVisitor.handler(Concat)
-    def visit_concat(self, node: Concat) -> Automata:
-        children: typing.Iterable[Regex] = node.get_children()
-        
-        if len(children) == 0:
-            return self.visit(One())
+    def visit_concat(self, node: Concat) -> typing.Generator[Regex, Automata, Automata]:
+        children: typing.Sequence[Regex] = node.get_children()
         
-        children: typing.Iterator[Regex] = iter(children)
+        if len(children) == 1:
+            return (yield children[0])
         
-        result: Automata = self.visit(next(children))
+        auts: typing.List[Automata] = []
         for child in children:
-            result = aut_concat(result, self.visit(child))
+            auts.append((yield child))
         
-        return result
+        # Merging everything at once, instead of re-copying the accumulated result for each child
+        return aut_concat_many(auts)
 
     @TreeVisitor.handler(Star)
-    def visit_star(self, node: Star) -> Automata:
-        return aut_star(self.visit(node.get_children()[0]))
+    def visit_star(self, node: Star) -> typing.Generator[Regex, Automata, Automata]:
+        # Not inplace, since the child's automata may be shared through memoization
+        return aut_star((yield node.get_children()[0]))
 
-    @TreeVisitor.handler(Either)
-    def visit_either(self, node: Either) -> Automata:
-        children: typing.Iterable[Regex] = node.get_children()
+    @TreeVisitor.handler(Repeat)
+    def visit_repeat(self, node: Repeat) -> typing.Generator[Regex, Automata, Automata]:
+        if node.max == 0:
+            return self.visit_one(One())
+        
+        child: Automata = yield node.get_children()[0]
+        
+        # The child's automata is built once, and all the copies are chained in a single merge
+        auts: typing.List[Automata] = [child] * node.min
         
-        if len(children) == 0:
-            return self.visit(Zero())
+        if node.max is None:
+            auts.append(aut_star(child))
+        elif node.max > node.min:
+            auts.extend([aut_join(self.visit_one(One()), child)] * (node.max - node.min))
         
-        children: typing.Iterator[Regex] = iter(children)
+        if len(auts) == 1:
+            return auts[0]
+        
+        return aut_concat_many(auts)
+
+    @TreeVisitor.handler(Either)
+    def visit_either(self, node: Either) -> typing.Generator[Regex, Automata, Automata]:
+        children: typing.Sequence[Regex] = node.get_children()
         
-        result: Automata = self.visit(next(children))
+        if len(children) == 1:
+            return (yield children[0])
+        
+        auts: typing.List[Automata] = []
         for child in children:
-            result = aut_join(result, self.visit(child))
+            auts.append((yield child))
         
-        return result
+        return aut_join_many(auts)
 
 
 class AutomataToRegexConverter:
@@ -113,8 +145,8 @@ class AutomataToRegexConverter:
     
     def _prepare(self) -> None:
         self.aut = make_edges_1(self.aut)
-        self.aut = unify_term(self.aut)
-        self.aut = aut_trim(self.aut)
+        self.aut = unify_term(self.aut, inplace=True)
+        self.aut = aut_trim(self.aut, coaccessible=True, inplace=True)
         
         self._convert_to_re_automata()
     
@@ -128,7 +160,11 @@ class AutomataToRegexConverter:
         # Copying to avoid messing up the iteration
         for edge in list(self.aut.get_edges()):
             self.aut.unlink(edge)
-            regex: Regex = Letter(edge.label) if edge.label else One()
+            regex: Regex
+            if isinstance(edge.label, CharClass):
+                regex = CharSet(edge.label)
+            else:
+                regex = Letter(edge.label) if edge.label else One()
             self.aut.link(edge.src, edge.dst, regex)
         
         for node in self.aut.get_nodes():
@@ -237,10 +273,44 @@ class AutomataToRegexConverter:
         )
 
        
-def regex_to_automata(regex: Regex | str, alphabet: str | None = None) -> Automata:
+def regex_to_automata(regex: Regex | str, alphabet: str | None = None, method: str = "thompson") -> Automata:
+    """
+    method may be one of:
+     - "thompson": the classic construction with plenty of epsilon edges
+     - "glushkov": the position automata, epsilon-free and with one node per letter occurrence (plus the start)
+     - "antimirov": the partial derivative automata, epsilon-free and usually smaller than the position one
+    """
+
+    if isinstance(regex, str):
+        regex = parse_regex(regex)
+    
+    if method == "thompson":
+        return RegexToAutomataConverter(alphabet=alphabet).apply(regex)
+    if method == "glushkov":
+        return regex_to_glushkov(regex, alphabet=alphabet)
+    if method == "antimirov":
+        return regex_to_antimirov(regex, alphabet=alphabet)
+    
+    raise ValueError(f"Unknown regex to automata conversion method: {method!r}")
+
+
+def regex_to_dfa(regex: Regex | str, alphabet: str | None = None, method: str = "subset") -> Automata:
+    """
+    method may be one of:
+     - "subset": regex_to_automata, followed by the subset construction (make_dfa)
+     - "derivatives": Brzozowski's construction, which takes (normalized) derivatives
+       of the regex by each letter. Often gives a nearly minimal DFA right away
+    """
+
     if isinstance(regex, str):
         regex = parse_regex(regex)
-    return RegexToAutomataConverter(alphabet=alphabet).apply(regex)
+    
+    if method == "subset":
+        return make_dfa(regex_to_automata(regex, alphabet=alphabet), inplace=True)
+    if method == "derivatives":
+        return regex_to_derivative_dfa(regex, alphabet=alphabet)
+    
+    raise ValueError(f"Unknown regex to DFA conversion method: {method!r}")
 
 
 def automata_to_regex(aut: Automata) -> Regex:
@@ -248,5 +318,5 @@ def automata_to_regex(aut: Automata) -> Regex:
 
 
 __all__ = [
-    "regex_to_automata", "automata_to_regex",
+    "regex_to_automata", "regex_to_dfa", "automata_to_regex",
 ]
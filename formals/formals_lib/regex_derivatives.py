@@ -0,0 +1,495 @@
+from __future__ import annotations
+import typing
+from collections import deque
+
+from .automata import *
+from .regex import *
+from .itree import TreeVisitor, MemoTreeVisitor
+from .regex_optimize import RegexOptimizer, optimize_regex
+
+
+class NullableChecker(MemoTreeVisitor[Regex]):
+    """
+    Checks whether the regex accepts the empty word
+    """
+
+    warn_on_generic: typing.ClassVar[bool] = True
+
+
+    @TreeVisitor.handler(Letter)
+    def visit_letter(self, node: Letter) -> bool:
+        return False
+
+    @TreeVisitor.handler(CharSet)
+    def visit_charset(self, node: CharSet) -> bool:
+        return False
+
+    @TreeVisitor.handler(Zero)
+    def visit_zero(self, node: Zero) -> bool:
+        return False
+
+    @TreeVisitor.handler(One)
+    def visit_one(self, node: One) -> bool:
+        return True
+
+    @TreeVisitor.handler(Concat)
+    def visit_concat(self, node: Concat) -> typing.Generator[Regex, bool, bool]:
+        for child in node.get_children():
+            if not (yield child):
+                return False
+
+        return True
+
+    @TreeVisitor.handler(Repeat)
+    def visit_repeat(self, node: Repeat) -> typing.Generator[Regex, bool, bool]:
+        if node.min == 0:
+            return True
+
+        return (yield node.get_children()[0])
+
+    @TreeVisitor.handler(Star)
+    def visit_star(self, node: Star) -> bool:
+        return True
+
+    @TreeVisitor.handler(Either)
+    def visit_either(self, node: Either) -> typing.Generator[Regex, bool, bool]:
+        for child in node.get_children():
+            if (yield child):
+                return True
+
+        return False
+
+
+class LetterCollector(MemoTreeVisitor[Regex]):
+    """
+    Gathers the letters used in the regex, in the order of their appearance
+    """
+
+    warn_on_generic: typing.ClassVar[bool] = False
+
+    _letters: typing.Dict[str, None]
+
+
+    def __init__(self):
+        super().__init__()
+
+        self._letters = {}
+
+    def apply(self, regex: Regex) -> str:
+        self.visit(regex)
+
+        return ''.join(self._letters)
+
+    @TreeVisitor.handler(Letter)
+    def visit_letter(self, node: Letter) -> None:
+        self._letters[node.letter] = None
+
+    @TreeVisitor.handler(CharSet)
+    def visit_charset(self, node: CharSet) -> None:
+        self._letters.update(dict.fromkeys(node.charclass))
+
+
+def _repeat_rest(node: Repeat, nullable: typing.Callable[[Regex], bool]) -> Regex:
+    """
+    What's left of x^{m,M} after the first copy of x: x^{m-1,M-1}.
+    If x is nullable, the lower bound doesn't matter, so it's dropped
+    to keep the set of derivatives small
+    """
+
+    child: Regex = node.get_children()[0]
+
+    min_count: int = 0 if nullable(child) else max(node.min - 1, 0)
+    max_count: int | None = None if node.max is None else node.max - 1
+
+    return RegexOptimizer.make_repeat(child, min_count, max_count)
+
+
+class RegexDerivator(MemoTreeVisitor[Regex]):
+    """
+    Computes the Brzozowski derivative of a regex by a letter.
+    The results are normalized (up to associativity, commutativity and idempotence
+    of Either), so that the set of the derivatives of any regex is finite
+    """
+
+    warn_on_generic: typing.ClassVar[bool] = True
+
+    _letter: str
+    _nullable: typing.Callable[[Regex], bool]
+
+
+    def __init__(self, letter: str, nullable: typing.Callable[[Regex], bool] | None = None):
+        super().__init__()
+
+        assert len(letter) == 1
+
+        self._letter = letter
+        self._nullable = nullable if nullable is not None else NullableChecker().visit
+
+    @TreeVisitor.handler(Letter)
+    def visit_letter(self, node: Letter) -> Regex:
+        return One() if node.letter == self._letter else Zero()
+
+    @TreeVisitor.handler(CharSet)
+    def visit_charset(self, node: CharSet) -> Regex:
+        return One() if self._letter in node.charclass else Zero()
+
+    @TreeVisitor.handler(Zero)
+    def visit_zero(self, node: Zero) -> Regex:
+        return Zero()
+
+    @TreeVisitor.handler(One)
+    def visit_one(self, node: One) -> Regex:
+        return Zero()
+
+    @TreeVisitor.handler(Concat)
+    def visit_concat(self, node: Concat) -> typing.Generator[Regex, Regex, Regex]:
+        children: typing.Sequence[Regex] = node.get_children()
+        result: typing.List[Regex] = []
+
+        for i, child in enumerate(children):
+            result.append(RegexOptimizer.make_concat(((yield child), *children[i + 1:])))
+
+            if not self._nullable(child):
+                break
+
+        return RegexOptimizer.make_either(result, canonical=True)
+
+    @TreeVisitor.handler(Repeat)
+    def visit_repeat(self, node: Repeat) -> typing.Generator[Regex, Regex, Regex]:
+        if node.max == 0:
+            return Zero()
+
+        return RegexOptimizer.make_concat(((yield node.get_children()[0]), _repeat_rest(node, self._nullable)))
+
+    @TreeVisitor.handler(Star)
+    def visit_star(self, node: Star) -> typing.Generator[Regex, Regex, Regex]:
+        return RegexOptimizer.make_concat(((yield node.get_children()[0]), node))
+
+    @TreeVisitor.handler(Either)
+    def visit_either(self, node: Either) -> typing.Generator[Regex, Regex, Regex]:
+        result: typing.List[Regex] = []
+        for child in node.get_children():
+            result.append((yield child))
+
+        return RegexOptimizer.make_either(result, canonical=True)
+
+
+class DerivativeMatcher:
+    """
+    A lazily built DFA, whose states are the (normalized) derivatives of the regex.
+    States and transitions are only derived once the input reaches them
+    """
+
+    alphabet: str
+    _states: typing.Dict[Regex, int]
+    _regexes: typing.List[Regex]
+    _terms: typing.List[bool]
+    _transitions: typing.Dict[typing.Tuple[int, str], int]
+    _derivators: typing.Dict[str, RegexDerivator]
+    _nullable: typing.Dict[Regex, bool]
+    _nullable_checker: NullableChecker
+
+
+    def __init__(self, regex: Regex, alphabet: str | None = None):
+        regex = optimize_regex(regex)
+
+        if alphabet is None:
+            alphabet = LetterCollector().apply(regex)
+
+        self.alphabet = alphabet
+        self._states = {}
+        self._regexes = []
+        self._terms = []
+        self._transitions = {}
+        self._derivators = {}
+        self._nullable = {}
+        self._nullable_checker = NullableChecker()
+
+        self.state(regex)
+
+    @property
+    def start(self) -> int:
+        return 0
+
+    def __len__(self) -> int:
+        """
+        The amount of states derived so far
+        """
+
+        return len(self._regexes)
+
+    def is_nullable(self, regex: Regex) -> bool:
+        result: bool | None = self._nullable.get(regex)
+
+        if result is None:
+            result = self._nullable_checker.visit(regex)
+            self._nullable[regex] = result
+
+        return result
+
+    def state(self, regex: Regex) -> int:
+        """
+        Returns the id of the state corresponding to the (normalized) regex, creating it if necessary
+        """
+
+        result: int | None = self._states.get(regex)
+
+        if result is None:
+            result = len(self._regexes)
+            self._states[regex] = result
+            self._regexes.append(regex)
+            self._terms.append(self.is_nullable(regex))
+
+        return result
+
+    def regex(self, state: int) -> Regex:
+        return self._regexes[state]
+
+    def is_term(self, state: int) -> bool:
+        return self._terms[state]
+
+    def step(self, state: int, letter: str) -> int:
+        result: int | None = self._transitions.get((state, letter))
+
+        if result is None:
+            derivator: RegexDerivator | None = self._derivators.get(letter)
+            if derivator is None:
+                derivator = RegexDerivator(letter, nullable=self.is_nullable)
+                self._derivators[letter] = derivator
+
+            result = self.state(derivator.visit(self._regexes[state]))
+            self._transitions[state, letter] = result
+
+        return result
+
+    def accepts(self, word: str) -> bool:
+        state: int = self.start
+
+        for letter in word:
+            state = self.step(state, letter)
+
+            if isinstance(self._regexes[state], Zero):
+                return False
+
+        return self.is_term(state)
+
+    def build(self) -> Automata:
+        """
+        Derives all the reachable states and returns the resulting (partial) DFA.
+        The dead state (the Zero regex) is omitted, along with the edges into it
+        """
+
+        result = Automata(self.alphabet)
+
+        result.start.is_term = self.is_term(self.start)
+
+        nodes: typing.Dict[int, Node] = {self.start: result.start}
+        queue: typing.Deque[int] = deque([self.start])
+
+        while queue:
+            state: int = queue.popleft()
+
+            for letter in self.alphabet:
+                dst_state: int = self.step(state, letter)
+
+                if isinstance(self._regexes[dst_state], Zero):
+                    continue
+
+                dst: Node | None = nodes.get(dst_state)
+                if dst is None:
+                    dst = result.make_node(term=self.is_term(dst_state))
+                    nodes[dst_state] = dst
+                    queue.append(dst_state)
+
+                result.link(nodes[state], dst, letter)
+
+        return result
+
+
+class PartialDerivator(MemoTreeVisitor[Regex]):
+    """
+    Computes Antimirov's partial derivatives of a regex by a letter:
+    a set of regexes, whose union is the Brzozowski derivative
+    """
+
+    warn_on_generic: typing.ClassVar[bool] = True
+
+    _letter: str
+    _nullable: typing.Callable[[Regex], bool]
+
+
+    def __init__(self, letter: str, nullable: typing.Callable[[Regex], bool] | None = None):
+        super().__init__()
+
+        assert len(letter) == 1
+
+        self._letter = letter
+        self._nullable = nullable if nullable is not None else NullableChecker().visit
+
+    def apply(self, regex: Regex) -> typing.Tuple[Regex, ...]:
+        return tuple(self.visit(regex))
+
+    # The handlers return dicts instead of sets to keep the order deterministic
+
+    @TreeVisitor.handler(Letter)
+    def visit_letter(self, node: Letter) -> typing.Dict[Regex, None]:
+        return {One(): None} if node.letter == self._letter else {}
+
+    @TreeVisitor.handler(CharSet)
+    def visit_charset(self, node: CharSet) -> typing.Dict[Regex, None]:
+        return {One(): None} if self._letter in node.charclass else {}
+
+    @TreeVisitor.handler(Zero)
+    def visit_zero(self, node: Zero) -> typing.Dict[Regex, None]:
+        return {}
+
+    @TreeVisitor.handler(One)
+    def visit_one(self, node: One) -> typing.Dict[Regex, None]:
+        return {}
+
+    @TreeVisitor.handler(Concat)
+    def visit_concat(self, node: Concat) -> typing.Generator[Regex, typing.Dict[Regex, None], typing.Dict[Regex, None]]:
+        children: typing.Sequence[Regex] = node.get_children()
+        result: typing.Dict[Regex, None] = {}
+
+        for i, child in enumerate(children):
+            for term in (yield child):
+                result[RegexOptimizer.make_concat((term, *children[i + 1:]))] = None
+
+            if not self._nullable(child):
+                break
+
+        return result
+
+    @TreeVisitor.handler(Repeat)
+    def visit_repeat(self, node: Repeat) -> typing.Generator[Regex, typing.Dict[Regex, None], typing.Dict[Regex, None]]:
+        if node.max == 0:
+            return {}
+
+        rest: Regex = _repeat_rest(node, self._nullable)
+
+        return {
+            RegexOptimizer.make_concat((term, rest)): None
+            for term in (yield node.get_children()[0])
+        }
+
+    @TreeVisitor.handler(Star)
+    def visit_star(self, node: Star) -> typing.Generator[Regex, typing.Dict[Regex, None], typing.Dict[Regex, None]]:
+        return {
+            RegexOptimizer.make_concat((term, node)): None
+            for term in (yield node.get_children()[0])
+        }
+
+    @TreeVisitor.handler(Either)
+    def visit_either(self, node: Either) -> typing.Generator[Regex, typing.Dict[Regex, None], typing.Dict[Regex, None]]:
+        result: typing.Dict[Regex, None] = {}
+
+        for child in node.get_children():
+            result.update((yield child))
+
+        return result
+
+
+class AntimirovConverter:
+    """
+    Builds the partial derivative automata: an epsilon-free NFA whose nodes are
+    the partial derivatives of the regex. It never has more nodes than the
+    position automata, and usually has fewer
+    """
+
+    _alphabet: str | None
+    _nullable: typing.Dict[Regex, bool]
+    _nullable_checker: NullableChecker
+    _partial: typing.Dict[typing.Tuple[Regex, str], typing.Tuple[Regex, ...]]
+    _derivators: typing.Dict[str, PartialDerivator]
+
+
+    def __init__(self, alphabet: str | None = None):
+        self._alphabet = alphabet
+        self._nullable = {}
+        self._nullable_checker = NullableChecker()
+        self._partial = {}
+        self._derivators = {}
+
+    def is_nullable(self, regex: Regex) -> bool:
+        result: bool | None = self._nullable.get(regex)
+
+        if result is None:
+            result = self._nullable_checker.visit(regex)
+            self._nullable[regex] = result
+
+        return result
+
+    def partial_derivatives(self, regex: Regex, letter: str) -> typing.Tuple[Regex, ...]:
+        result: typing.Tuple[Regex, ...] | None = self._partial.get((regex, letter))
+
+        if result is None:
+            # Reusing the derivators lets them share their memo between the terms
+            derivator: PartialDerivator | None = self._derivators.get(letter)
+            if derivator is None:
+                derivator = PartialDerivator(letter, nullable=self.is_nullable)
+                self._derivators[letter] = derivator
+
+            result = derivator.apply(regex)
+            self._partial[regex, letter] = result
+
+        return result
+
+    def apply(self, regex: Regex) -> Automata:
+        regex = optimize_regex(regex)
+
+        alphabet: str = LetterCollector().apply(regex)
+        if self._alphabet is not None:
+            assert set(alphabet).issubset(set(self._alphabet)), "Unspecified alphabet used!"
+
+            alphabet = self._alphabet
+
+        result = Automata(alphabet)
+
+        result.start.is_term = self.is_nullable(regex)
+
+        nodes: typing.Dict[Regex, Node] = {regex: result.start}
+        queue: typing.Deque[Regex] = deque([regex])
+
+        while queue:
+            term: Regex = queue.popleft()
+
+            for letter in alphabet:
+                for dst_term in self.partial_derivatives(term, letter):
+                    dst: Node | None = nodes.get(dst_term)
+
+                    if dst is None:
+                        dst = result.make_node(term=self.is_nullable(dst_term))
+                        nodes[dst_term] = dst
+                        queue.append(dst_term)
+
+                    result.link(nodes[term], dst, letter)
+
+        return result
+
+
+def regex_is_nullable(regex: Regex) -> bool:
+    return NullableChecker().visit(regex)
+
+
+def regex_derivative(regex: Regex, letter: str) -> Regex:
+    return RegexDerivator(letter).visit(regex)
+
+
+def regex_partial_derivatives(regex: Regex, letter: str) -> typing.Tuple[Regex, ...]:
+    return PartialDerivator(letter).apply(regex)
+
+
+def regex_to_derivative_dfa(regex: Regex, alphabet: str | None = None) -> Automata:
+    return DerivativeMatcher(regex, alphabet=alphabet).build()
+
+
+def regex_to_antimirov(regex: Regex, alphabet: str | None = None) -> Automata:
+    return AntimirovConverter(alphabet=alphabet).apply(regex)
+
+
+__all__ = [
+    "DerivativeMatcher",
+    "regex_is_nullable", "regex_derivative", "regex_partial_derivatives",
+    "regex_to_derivative_dfa", "regex_to_antimirov",
+]
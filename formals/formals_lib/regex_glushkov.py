@@ -0,0 +1,172 @@
+from __future__ import annotations
+import typing
+import dataclasses
+
+from .automata import *
+from .regex import *
+from .itree import TreeVisitor
+from .charclass import CharClass
+
+
+class GlushkovConverter(TreeVisitor[Regex]):
+    """
+    Builds the position automata: one node per letter occurrence, plus the start.
+    The result has no epsilon edges, so it needs no make_edges_1 afterwards.
+    Note: this visitor mustn't be memoized, since every occurrence of a shared
+    subtree needs its own positions
+    """
+
+    warn_on_generic: typing.ClassVar[bool] = True
+
+
+    @dataclasses.dataclass
+    class Info:
+        nullable: bool
+        first: typing.Set[int] = dataclasses.field(default_factory=set)
+        last: typing.Set[int] = dataclasses.field(default_factory=set)
+
+
+    _alphabet: str | None
+    # Position i corresponds to the letter (or class) _letters[i - 1]
+    _letters: typing.List[str | CharClass]
+    _follow: typing.List[typing.Set[int]]
+
+
+    def __init__(self, alphabet: str | None = None):
+        super().__init__()
+
+        self._alphabet = alphabet
+        self._letters = []
+        self._follow = []
+
+    def apply(self, regex: Regex) -> Automata:
+        info: GlushkovConverter.Info = self.visit(regex)
+
+        # Class labels carry their letters themselves, so listing them would only cost memory
+        alphabet: str = ''.join(dict.fromkeys(''.join(label for label in self._letters if isinstance(label, str))))
+        if self._alphabet is not None:
+            assert set(alphabet).issubset(set(self._alphabet)), "Unspecified alphabet used!"
+
+            alphabet = self._alphabet
+
+        result = Automata(alphabet)
+
+        result.start.is_term = info.nullable
+
+        nodes: typing.List[Node] = [result.start]
+        for pos in range(1, len(self._letters) + 1):
+            nodes.append(result.make_node(term=(pos in info.last)))
+
+        for pos in info.first:
+            result.link(result.start, nodes[pos], self._letters[pos - 1])
+
+        for src, follow in enumerate(self._follow, start=1):
+            for dst in follow:
+                result.link(nodes[src], nodes[dst], self._letters[dst - 1])
+
+        return result
+
+    def _link_all(self, srcs: typing.Iterable[int], dsts: typing.Set[int]) -> None:
+        for src in srcs:
+            self._follow[src - 1].update(dsts)
+
+    def _add_position(self, label: str | CharClass) -> Info:
+        self._letters.append(label)
+        self._follow.append(set())
+
+        # Shared subtrees get visited once per occurrence, and so get distinct positions
+        pos: int = len(self._letters)
+
+        return self.Info(False, {pos}, {pos})
+
+    @TreeVisitor.handler(Letter)
+    def visit_letter(self, node: Letter) -> Info:
+        return self._add_position(node.letter)
+
+    @TreeVisitor.handler(CharSet)
+    def visit_charset(self, node: CharSet) -> Info:
+        if not node.charclass:
+            return self.Info(False)
+
+        return self._add_position(node.charclass.as_label())
+
+    @TreeVisitor.handler(Zero)
+    def visit_zero(self, node: Zero) -> Info:
+        return self.Info(False)
+
+    @TreeVisitor.handler(One)
+    def visit_one(self, node: One) -> Info:
+        return self.Info(True)
+
+    def _append(self, result: Info, child_info: Info) -> None:
+        self._link_all(result.last, child_info.first)
+
+        if result.nullable:
+            result.first |= child_info.first
+
+        if child_info.nullable:
+            result.last |= child_info.last
+        else:
+            result.last = child_info.last
+
+        result.nullable = result.nullable and child_info.nullable
+
+    @TreeVisitor.handler(Concat)
+    def visit_concat(self, node: Concat) -> typing.Generator[Regex, Info, Info]:
+        result: GlushkovConverter.Info = self.Info(True)
+
+        for child in node.get_children():
+            self._append(result, (yield child))
+
+        return result
+
+    @TreeVisitor.handler(Repeat)
+    def visit_repeat(self, node: Repeat) -> typing.Generator[Regex, Info, Info]:
+        # x^{m,M} is m copies of x, followed by M - m optional ones, or by x* if M is unbounded
+        result: GlushkovConverter.Info = self.Info(True)
+        count: int = node.max if node.max is not None else max(node.min, 1)
+
+        for i in range(count):
+            # Every copy gets its own positions
+            child_info: GlushkovConverter.Info = yield node.get_children()[0]
+
+            if node.max is None and i == count - 1:
+                self._link_all(child_info.last, child_info.first)
+
+            if i >= node.min:
+                child_info.nullable = True
+
+            self._append(result, child_info)
+
+        return result
+
+    @TreeVisitor.handler(Star)
+    def visit_star(self, node: Star) -> typing.Generator[Regex, Info, Info]:
+        result: GlushkovConverter.Info = yield node.get_children()[0]
+
+        self._link_all(result.last, result.first)
+        result.nullable = True
+
+        return result
+
+    @TreeVisitor.handler(Either)
+    def visit_either(self, node: Either) -> typing.Generator[Regex, Info, Info]:
+        result: GlushkovConverter.Info = self.Info(False)
+
+        for child in node.get_children():
+            child_info: GlushkovConverter.Info = yield child
+
+            result.nullable = result.nullable or child_info.nullable
+            result.first |= child_info.first
+            result.last |= child_info.last
+
+        return result
+
+
+def regex_to_glushkov(regex: Regex, alphabet: str | None = None) -> Automata:
+    return GlushkovConverter(alphabet=alphabet).apply(regex)
+
+
+__all__ = [
+    "regex_to_glushkov",
+]
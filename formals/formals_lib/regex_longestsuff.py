@@ -1,13 +1,14 @@
 from __future__ import annotations
 import typing
 import dataclasses
+import math
 
 from .regex import *
-from .itree import TreeVisitor
+from .itree import TreeVisitor, MemoTreeVisitor
 
 
 # Solves hw task 6.5, but encapsulated here to support unit-testing
-class SuffixCounterVisitor(TreeVisitor[Regex]):
+class SuffixCounterVisitor(MemoTreeVisitor[Regex]):
     warn_on_generic: typing.ClassVar[bool] = True
     
     _target_letter: str
@@ -77,6 +78,12 @@ class SuffixCounterVisitor(TreeVisitor[Regex]):
             return self.Result(1, 1)
         return self.Result(0, None)
     
+    @TreeVisitor.handler(CharSet)
+    def visit_charset(self, node: CharSet) -> Result:
+        if self._target_letter in node.charclass:
+            return self.Result(1, 1)
+        return self.Result(0, None)
+    
     @TreeVisitor.handler(Zero)
     def visit_zero(self, node: Zero) -> Result:
         raise ValueError("Zero is not allowed in the regex")
@@ -86,17 +93,17 @@ class SuffixCounterVisitor(TreeVisitor[Regex]):
         return self.Result(0, 0)
     
     @TreeVisitor.handler(Concat)
-    def visit_concat(self, node: Concat) -> Result:
+    def visit_concat(self, node: Concat) -> typing.Generator[Regex, Result, Result]:
         result: SuffixCounterVisitor.Result = self.Result(0, 0)
         
         for child in reversed(node.get_children()):
-            result.update_seq(self.visit(child))
+            result.update_seq((yield child))
         
         return result
 
     @TreeVisitor.handler(Star)
-    def visit_star(self, node: Star) -> Result:
-        child_result: SuffixCounterVisitor.Result = self.visit(node.get_children()[0])
+    def visit_star(self, node: Star) -> typing.Generator[Regex, Result, Result]:
+        child_result: SuffixCounterVisitor.Result = yield node.get_children()[0]
         
         if not child_result.can_be_full:
             return self.Result(child_result.best_suff_len, 0)
@@ -106,15 +113,42 @@ class SuffixCounterVisitor(TreeVisitor[Regex]):
         
         return child_result
 
+    @TreeVisitor.handler(Repeat)
+    def visit_repeat(self, node: Repeat) -> typing.Generator[Regex, Result, Result]:
+        if node.max == 0:
+            return self.Result(0, 0)
+        
+        child_result: SuffixCounterVisitor.Result = yield node.get_children()[0]
+        
+        # Only the last copy may contribute to the suffix
+        if not child_result.can_be_full:
+            return self.Result(child_result.best_suff_len, 0 if node.min == 0 else None)
+        
+        # Otherwise, the more copies, the better
+        if node.max is None:
+            if child_result.best_full_len > 0:
+                return self.Result(float("+inf"), float("+inf"))
+            
+            return self.Result(child_result.best_suff_len, 0)
+        
+        best_suff_len: float = child_result.best_suff_len
+        
+        # Skipped for a single copy, since inf * 0 would give nan. An infinite
+        # full match implies an infinite suffix anyway
+        if node.max > 1 and math.isfinite(child_result.best_full_len):
+            best_suff_len += child_result.best_full_len * (node.max - 1)
+        
+        return self.Result(best_suff_len, child_result.best_full_len * node.max)
+
     @TreeVisitor.handler(Either)
-    def visit_either(self, node: Either) -> Result:
+    def visit_either(self, node: Either) -> typing.Generator[Regex, Result, Result]:
         if len(node.get_children()) == 0:
             raise ValueError("Empty either (zero) is not allowed in the regex")
         
         result: SuffixCounterVisitor.Result = self.Result(0, None)
         
         for child in node.get_children():
-            result.update_alt(self.visit(child))
+            result.update_alt((yield child))
         
         return result
 
@@ -1,11 +1,12 @@
 from __future__ import annotations
 import typing
+import operator
 
 from .regex import *
-from .itree import TreeVisitor
+from .itree import TreeVisitor, MemoTreeVisitor
 
 
-class RegexOptimizer(TreeVisitor[Regex]):
+class RegexOptimizer(MemoTreeVisitor[Regex]):
     warn_on_generic: typing.ClassVar[bool] = True
     
 
@@ -13,6 +14,17 @@ class RegexOptimizer(TreeVisitor[Regex]):
     def visit_letter(self, node: Letter) -> Regex:
         return node
     
+    @TreeVisitor.handler(CharSet)
+    def visit_charset(self, node: CharSet) -> Regex:
+        if not node.charclass:
+            return Zero()
+        
+        letter: str | None = node.charclass.single()
+        if letter is not None:
+            return Letter(letter)
+        
+        return node
+    
     @TreeVisitor.handler(Zero)
     def visit_zero(self, node: Zero) -> Regex:
         return node
@@ -22,12 +34,37 @@ class RegexOptimizer(TreeVisitor[Regex]):
         return node
     
     @TreeVisitor.handler(Concat)
-    def visit_concat(self, node: Concat) -> Regex:
-        result: typing.List[Regex] = []
+    def visit_concat(self, node: Concat) -> typing.Generator[Regex, Regex, Regex]:
+        children: typing.List[Regex] = []
+        for child in node.get_children():
+            children.append((yield child))
+
+        return self.make_concat(children)
+
+    @TreeVisitor.handler(Star)
+    def visit_star(self, node: Star) -> typing.Generator[Regex, Regex, Regex]:
+        return self.make_star((yield node.get_children()[0]))
+
+    @TreeVisitor.handler(Repeat)
+    def visit_repeat(self, node: Repeat) -> typing.Generator[Regex, Regex, Regex]:
+        return self.make_repeat((yield node.get_children()[0]), node.min, node.max)
 
+    @TreeVisitor.handler(Either)
+    def visit_either(self, node: Either) -> typing.Generator[Regex, Regex, Regex]:
+        children: typing.List[Regex] = []
         for child in node.get_children():
-            child_regex: Regex = self.visit(child)
-            
+            children.append((yield child))
+
+        return self.make_either(children)
+    
+    # The following assume their arguments to already be optimized,
+    # which lets other algorithms build normalized regexes directly
+    
+    @staticmethod
+    def make_concat(children: typing.Iterable[Regex]) -> Regex:
+        result: typing.List[Regex] = []
+
+        for child_regex in children:
             if isinstance(child_regex, Zero):
                 return child_regex
             
@@ -47,24 +84,48 @@ class RegexOptimizer(TreeVisitor[Regex]):
             return result[0]
         
         return Concat(*result)
-
-    @TreeVisitor.handler(Star)
-    def visit_star(self, node: Star) -> Regex:
-        child_regex: Regex = self.visit(node.get_children()[0])
-        
+    
+    @staticmethod
+    def make_star(child_regex: Regex) -> Regex:
         if isinstance(child_regex, (Zero, One)):
             return One()
         
+        if isinstance(child_regex, Star):
+            return child_regex
+        
         return Star(child_regex)
+    
+    @staticmethod
+    def make_repeat(child_regex: Regex, min_count: int, max_count: int | None) -> Regex:
+        if max_count == 0 or isinstance(child_regex, One):
+            return One()
+        
+        if isinstance(child_regex, Zero):
+            return One() if min_count == 0 else child_regex
+        
+        if min_count == 0 and max_count is None:
+            return RegexOptimizer.make_star(child_regex)
+        
+        # At least one copy of x* is still just x*
+        if isinstance(child_regex, Star):
+            return child_regex
+        
+        if min_count == max_count == 1:
+            return child_regex
+        
+        return Repeat(child_regex, min_count, max_count)
+    
+    @staticmethod
+    def make_either(children: typing.Iterable[Regex], canonical: bool = False) -> Regex:
+        """
+        If canonical is True, the children are also sorted, so that
+        any permutation of the same alternatives gives the same regex
+        """
 
-    @TreeVisitor.handler(Either)
-    def visit_either(self, node: Either) -> Regex:
         # Not a set because we want to preserve order
         result: typing.Dict[Regex, None] = dict()
 
-        for child in node.get_children():
-            child_regex: Regex = self.visit(child)
-            
+        for child_regex in children:
             if isinstance(child_regex, Zero):
                 continue
             
@@ -76,6 +137,10 @@ class RegexOptimizer(TreeVisitor[Regex]):
         
         result: typing.List[Regex] = list(result.keys())
         
+        if canonical:
+            # Interned regexes are numbered at creation, which is much cheaper than reconstructing them
+            result.sort(key=operator.attrgetter("_seq"))
+        
         if len(result) == 0:
             return Zero()
         
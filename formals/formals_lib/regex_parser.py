@@ -3,9 +3,10 @@ import typing
 import io
 import dataclasses
 import enum
-import contextlib
+import re
 
 from . import regex
+from .charclass import CharClass
 
 
 class RegexSyntaxError(RuntimeError):
@@ -15,6 +16,7 @@ class RegexSyntaxError(RuntimeError):
 class RegexTokenType(enum.Enum):
     digit = enum.auto()
     letter = enum.auto()
+    charset = enum.auto()
     star = enum.auto()
     add = enum.auto()
     lpar = enum.auto()
@@ -23,16 +25,52 @@ class RegexTokenType(enum.Enum):
     eof = enum.auto()
 
 
-@dataclasses.dataclass
+@dataclasses.dataclass(frozen=True)
 class RegexToken:
     token_type: RegexTokenType
     value: typing.Any = None
 
 
 class RegexParser:
+    """
+    A predictive parser: one token of lookahead decides every step, so there's
+    no backtracking. Nesting is kept on an explicit stack of groups, which
+    means that the depth of parentheses isn't bounded by the recursion limit
+    """
+
+    _TOKEN_RE: typing.ClassVar[re.Pattern] = re.compile(r"""
+          (?P<space>\s+)
+        | (?P<pow>\^\s*(?P<power>\d+))
+        | (?P<range>\^\s*\{\s*(?P<min>\d+)\s*(?P<comma>,\s*(?P<max>\d*)\s*)?\})
+        | (?P<plus>\^\s*\+)
+        | (?P<bad_pow>\^)
+        | (?P<op>[*+()])
+        | (?P<digit>\d)
+        | (?P<letter>[^\W\d_])
+        | (?P<charset>\[(?P<body>(?:\\.|[^\]\\])*)\])
+        | (?P<bad_charset>\[)
+        | (?P<other>.)
+    """, re.VERBOSE | re.DOTALL)
+
+    # Escaped or plain characters inside of a class
+    _CLASS_ITEM_RE: typing.ClassVar[re.Pattern] = re.compile(r"\\(.)|(.)", re.DOTALL)
+
+    _OPS: typing.ClassVar[typing.Mapping[str, RegexTokenType]] = {
+        "*": RegexTokenType.star,
+        "+": RegexTokenType.add,
+        "(": RegexTokenType.lpar,
+        ")": RegexTokenType.rpar,
+    }
+
+
+    @dataclasses.dataclass
+    class Group:
+        alternatives: typing.List[regex.Regex] = dataclasses.field(default_factory=list)
+        items: typing.List[regex.Regex] = dataclasses.field(default_factory=list)
+
+
     _src: io.TextIOBase
-    _tokens: typing.Tuple[RegexToken, ...]
-    _pos: int
+    _tokens: typing.List[RegexToken]
     
     def __init__(self, src: str | io.TextIOBase):
         if isinstance(src, str):
@@ -42,163 +80,171 @@ class RegexParser:
     
     def tokenize(self):
         if not hasattr(self, "_tokens"):
-            self._tokens = tuple(self._tokenize())
+            self._tokens = list(self._tokenize())
     
     def _tokenize(self) -> typing.Generator[RegexToken, None, None]:
-        def next_ch():
-            nonlocal ch
-            ch = self._src.read(1)
+        text: str = self._src.read()
 
-        def skip_space():
-            nonlocal ch
-            
-            while ch.isspace():
-                next_ch()
-
-        ch: str = ""
+        # Tokens are immutable, so the ones for the same text can be shared
+        cache: typing.Dict[str, RegexToken] = {}
 
-        lookup: typing.Final[typing.MappingView] = {
-            "*": RegexTokenType.star,
-            "+": RegexTokenType.add,
-            "(": RegexTokenType.lpar,
-            ")": RegexTokenType.rpar,
-        }
+        for match in self._TOKEN_RE.finditer(text):
+            kind: str = match.lastgroup
 
-        next_ch()
-        while ch:
-            skip_space()
-            
-            if ch in lookup:
-                yield RegexToken(lookup[ch])
-            elif ch.isdigit():
-                yield RegexToken(RegexTokenType.digit, int(ch))
-            elif ch.isalpha():
-                yield RegexToken(RegexTokenType.letter, ch)
-            elif ch == "^":
-                next_ch()
-                skip_space()
-                power: int = 0
-                if not ch.isdigit():
-                    raise RegexSyntaxError("Expected a number after '^'")
-                while ch.isdigit():
-                    power = power * 10 + int(ch)
-                    next_ch()
-                yield RegexToken(RegexTokenType.pow, power)
-                continue
-            next_ch()
+            if kind in ("op", "digit", "letter", "charset"):
+                token: RegexToken | None = cache.get(match.group())
+                if token is None:
+                    token = cache[match.group()] = self._make_token(kind, match.group())
+                yield token
+            elif kind == "pow":
+                power: int = int(match.group("power"))
+                yield RegexToken(RegexTokenType.pow, (power, power))
+            elif kind == "range":
+                min_count: int = int(match.group("min"))
+                max_count: int | None = min_count
+                if match.group("comma") is not None:
+                    max_count = int(match.group("max")) if match.group("max") else None
+                yield RegexToken(RegexTokenType.pow, (min_count, max_count))
+            elif kind == "plus":
+                yield RegexToken(RegexTokenType.pow, (1, None))
+            elif kind == "bad_charset":
+                raise RegexSyntaxError("Unterminated character class")
+            elif kind == "bad_pow":
+                raise RegexSyntaxError("Expected a number, '{m,n}' or '+' after '^'")
+            # Whitespace and unknown characters are skipped
         
         yield RegexToken(RegexTokenType.eof)
-    
-    def is_eof(self) -> bool:
-        return self._pos >= len(self._tokens)
-    
-    def cur(self) -> RegexToken:
-        return self.peek(0)
-    
-    def peek(self, n: int = 1) -> RegexToken:
-        pos = self._pos + n
-        if pos not in range(len(self._tokens)):
-            pos = -1
-        return self._tokens[pos]
-    
-    def next(self) -> None:
-        self._pos += 1
-    
-    def tell(self) -> int:
-        return self._pos
-    
-    def seek(self, pos: int) -> None:
-        self._pos = pos
-    
-    @contextlib.contextmanager
-    def maybe(self):
-        pos: int = self.tell()
-        try:
-            yield
-        except RegexSyntaxError:
-            self.seek(pos)
-    
-    def require_tok(self, token_type: RegexTokenType) -> typing.Any:
-        cur: RegexToken = self.cur()
-        if cur.token_type != token_type:
-            raise RegexSyntaxError(f"Expected {token_type.name} token, got {cur.token_type.name} instead")
-        self.next()
-        return cur.value
+
+    @classmethod
+    def _make_token(cls, kind: str, text: str) -> RegexToken:
+        if kind == "op":
+            return RegexToken(cls._OPS[text])
+        if kind == "digit":
+            return RegexToken(RegexTokenType.digit, int(text))
+        if kind == "charset":
+            return RegexToken(RegexTokenType.charset, cls._parse_class(text[1:-1]))
+        return RegexToken(RegexTokenType.letter, text)
+
+    @classmethod
+    def _parse_class(cls, body: str) -> CharClass:
+        """
+        Parses the inside of [...]: letters and ranges like a-z. Any character
+        may be escaped with a backslash, and a '-' at either end is literal.
+        A leading unescaped '^' negates the class, as in [^a-z]
+        """
+
+        # (letter, whether it was escaped)
+        items: typing.List[typing.Tuple[str, bool]] = [
+            (escaped or plain, bool(escaped)) for escaped, plain in cls._CLASS_ITEM_RE.findall(body)
+        ]
+
+        negated: bool = bool(items) and items[0] == ("^", False)
+        if negated:
+            items = items[1:]
+
+        ranges: typing.List[typing.Tuple[str, str]] = []
+        i: int = 0
+
+        while i < len(items):
+            lo: str = items[i][0]
+
+            if i + 2 < len(items) and items[i + 1] == ("-", False):
+                hi: str = items[i + 2][0]
+                if hi < lo:
+                    raise RegexSyntaxError(f"Invalid class range: {lo}-{hi}")
+
+                ranges.append((lo, hi))
+                i += 3
+            else:
+                ranges.append((lo, lo))
+                i += 1
+
+        result: CharClass = CharClass.from_ranges(ranges)
+
+        return ~result if negated else result
     
     def parse(self) -> regex.Regex:
         self.tokenize()
-        
-        self._pos = 0
-        
-        result: regex.Regex = self.parse_either()
 
-        self.require_tok(RegexTokenType.eof)
-        assert self.is_eof()
+        # Enum attribute lookups are slow enough to matter in the loop below
+        LPAR, RPAR, ADD, STAR, POW, LETTER, DIGIT, CHARSET = (
+            RegexTokenType.lpar, RegexTokenType.rpar, RegexTokenType.add, RegexTokenType.star,
+            RegexTokenType.pow, RegexTokenType.letter, RegexTokenType.digit, RegexTokenType.charset,
+        )
+
+        stack: typing.List[RegexParser.Group] = [self.Group()]
+        group: RegexParser.Group = stack[-1]
         
-        return result
+        for cur in self._tokens:
+            kind: RegexTokenType = cur.token_type
+            
+            if kind is LETTER or kind is DIGIT or kind is CHARSET:
+                group.items.append(self.make_atomic(cur))
+            elif kind is STAR or kind is POW:
+                if not group.items:
+                    raise RegexSyntaxError(f"Unexpected token: {kind.name}")
+                group.items[-1] = self.make_power(group.items[-1], cur)
+            elif kind is ADD:
+                group.alternatives.append(self.close_concat(group, cur))
+            elif kind is LPAR:
+                group = self.Group()
+                stack.append(group)
+            elif kind is RPAR:
+                if len(stack) == 1:
+                    raise RegexSyntaxError(f"Expected eof token, got {kind.name} instead")
+                stack.pop()
+                stack[-1].items.append(self.close_group(group, cur))
+                group = stack[-1]
+            else:
+                assert kind is RegexTokenType.eof
+                if len(stack) > 1:
+                    raise RegexSyntaxError(f"Expected rpar token, got {kind.name} instead")
+                break
+        
+        return self.close_group(group, cur)
     
-    def parse_either(self) -> regex.Regex:
-        items: typing.List[regex.Regex] = []
-        items.append(self.parse_concat())
-        while True:
-            with self.maybe():
-                self.require_tok(RegexTokenType.add)
-                items.append(self.parse_concat())
-                continue
-            break
+    @staticmethod
+    def close_concat(group: RegexParser.Group, cur: RegexToken) -> regex.Regex:
+        if not group.items:
+            raise RegexSyntaxError(f"Unexpected token: {cur.token_type.name}")
+        
+        items: typing.List[regex.Regex] = group.items
+        group.items = []
+        
         if len(items) == 1:
             return items[0]
-        return regex.Either(*items)
+        return regex.Concat(*items)
     
-    def parse_concat(self) -> regex.Regex:
-        items: typing.List[regex.Regex] = []
-        items.append(self.parse_power())
-        while True:
-            with self.maybe():
-                items.append(self.parse_power())
-                continue
-            break
+    @classmethod
+    def close_group(cls, group: RegexParser.Group, cur: RegexToken) -> regex.Regex:
+        items: typing.List[regex.Regex] = group.alternatives
+        items.append(cls.close_concat(group, cur))
+        
         if len(items) == 1:
             return items[0]
-        return regex.Concat(*items)
+        return regex.Either(*items)
     
-    def parse_power(self) -> regex.Regex:
-        item: regex.Regex = self.parse_atomic()
-        while True:
-            cur: RegexToken = self.cur()
-            if cur.token_type == RegexTokenType.star:
-                item = regex.Star(item)
-            elif cur.token_type == RegexTokenType.pow:
-                if cur.value not in range(20):
-                    raise RegexSyntaxError(f"Repeat count too big: {cur.value}")
-                item = item.repeat(cur.value)
-            else:
-                break
-
-            self.next()
-        return item
+    @staticmethod
+    def make_power(item: regex.Regex, cur: RegexToken) -> regex.Regex:
+        if cur.token_type == RegexTokenType.star:
+            return regex.Star(item)
+        
+        min_count, max_count = cur.value
+        if max_count is not None and max_count < min_count:
+            raise RegexSyntaxError(f"Invalid repeat range: {{{min_count},{max_count}}}")
+        return regex.Repeat(item, min_count, max_count)
     
-    def parse_atomic(self) -> regex.Regex:
-        cur: RegexToken = self.cur()
-        if cur.token_type == RegexTokenType.lpar:
-            return self.parse_par_expr()
+    @staticmethod
+    def make_atomic(cur: RegexToken) -> regex.Regex:
         if cur.token_type == RegexTokenType.letter:
-            self.next()
             return regex.Letter(cur.value)
-        if cur.token_type != RegexTokenType.digit:
-            raise RegexSyntaxError(f"Unexpected token: {cur.token_type.name}")
-        self.next()
+        if cur.token_type == RegexTokenType.charset:
+            return regex.CharSet(cur.value)
         if cur.value == 0:
             return regex.Zero()
         if cur.value == 1:
             return regex.One()
         raise RegexSyntaxError(f"{cur.value} is not a valid digit for regex")
-    
-    def parse_par_expr(self) -> regex.Regex:
-        self.require_tok(RegexTokenType.lpar)
-        result: regex.Regex = self.parse_either()
-        self.require_tok(RegexTokenType.rpar)
-        return result
 
 
 def parse_regex(src: str | io.TextIOBase) -> regex.Regex:
@@ -0,0 +1,145 @@
+from __future__ import annotations
+import typing
+import re
+
+from .itree import TreeVisitor
+from .regex import *
+from .regex import Reconstructor
+from .regex_parser import parse_regex
+from .regex_automata import regex_to_automata
+from .automata_match import DFAMatcher
+
+
+class RegexToRe(Reconstructor):
+    """
+    Translates the regex into the syntax of Python's re module.
+    Reuses the reconstructor's parenthesization, but with non-capturing groups
+    """
+
+    warn_on_generic: typing.ClassVar[bool] = True
+
+
+    def apply(self, regex: Regex) -> re.Pattern:
+        return re.compile(self.visit(regex))
+
+    @TreeVisitor.handler(Letter)
+    def visit_letter(self, node: Letter) -> str:
+        return re.escape(node.letter)
+
+    @TreeVisitor.handler(CharSet)
+    def visit_charset(self, node: CharSet) -> str:
+        if not node.charclass:
+            return "(?!)"
+
+        return "[" + "".join(self.class_range(lo, hi) for lo, hi in node.charclass.ranges) + "]"
+
+    @staticmethod
+    def class_range(lo: int, hi: int) -> str:
+        if lo == hi:
+            return re.escape(chr(lo))
+
+        return f"{re.escape(chr(lo))}-{re.escape(chr(hi))}"
+
+    @TreeVisitor.handler(Zero)
+    def visit_zero(self, node: Zero) -> str:
+        return "(?!)"
+
+    @TreeVisitor.handler(One)
+    def visit_one(self, node: One) -> str:
+        # Not just "", which would leave a following quantifier with nothing to repeat
+        return "(?:)"
+
+    @TreeVisitor.handler(Concat)
+    def visit_concat(self, node: Concat) -> typing.Generator[Regex, str, str]:
+        result: typing.List[str] = []
+
+        with self._set_par_level(self.ParLevel.either):
+            for child in node.get_children():
+                result.append((yield child))
+
+        result: str = "".join(result)
+        if self._par_level >= self.ParLevel.concat:
+            result = f"(?:{result})"
+
+        return result
+
+    @TreeVisitor.handler(Star)
+    def visit_star(self, node: Star) -> typing.Generator[Regex, str, str]:
+        child: Regex = node.get_children()[0]
+
+        # re doesn't allow stacking quantifiers
+        if isinstance(child, (Star, Repeat)):
+            with self._set_par_level(self.ParLevel.none):
+                return f"(?:{(yield child)})*"
+
+        with self._set_par_level(self.ParLevel.concat):
+            return (yield child) + "*"
+
+    @TreeVisitor.handler(Repeat)
+    def visit_repeat(self, node: Repeat) -> typing.Generator[Regex, str, str]:
+        with self._set_par_level(self.ParLevel.none):
+            child: str = yield node.get_children()[0]
+
+        # Wrapped unconditionally for the same reason
+        if node.min == node.max:
+            return f"(?:{child}){{{node.min}}}"
+        return f"(?:{child}){{{node.min},{'' if node.max is None else node.max}}}"
+
+    @TreeVisitor.handler(Either)
+    def visit_either(self, node: Either) -> typing.Generator[Regex, str, str]:
+        result: typing.List[str] = []
+
+        with self._set_par_level(self.ParLevel.none):
+            for child in node.get_children():
+                result.append((yield child))
+
+        result: str = "|".join(result)
+        if self._par_level >= self.ParLevel.either:
+            result = f"(?:{result})"
+
+        return result
+
+
+class ReMatcher:
+    """
+    Matches whole words with re.fullmatch, so the matching itself runs in C
+    """
+
+    regex: Regex
+    pattern: re.Pattern
+
+
+    def __init__(self, regex: Regex):
+        self.regex = regex
+        self.pattern = regex_to_re(regex)
+
+    def accepts(self, word: str) -> bool:
+        return self.pattern.fullmatch(word) is not None
+
+
+def regex_to_re(regex: Regex) -> re.Pattern:
+    return RegexToRe().apply(regex)
+
+
+def compile_regex(regex: Regex | str, backend: str = "re", alphabet: str | None = None) -> ReMatcher | DFAMatcher:
+    """
+    Both backends give objects with an accepts(word) method.
+    backend may be one of:
+     - "re": delegates to Python's re module, which is usually the fastest for simple regexes
+     - "automata": builds a DFA out of the regex and runs a DFAMatcher
+    """
+
+    if isinstance(regex, str):
+        regex = parse_regex(regex)
+
+    if backend == "re":
+        return ReMatcher(regex)
+    if backend == "automata":
+        return DFAMatcher(regex_to_automata(regex, alphabet=alphabet))
+
+    raise ValueError(f"Unknown regex matching backend: {backend!r}")
+
+
+__all__ = [
+    "ReMatcher", "regex_to_re", "compile_regex",
+]
@@ -8,18 +8,33 @@ import string
 import itertools
 import re
 import sys
+import mmap
+import tempfile
+import time
 
 import utils
 from formals_lib.regex import *
 from formals_lib.automata import *
 from formals_lib.automata_ops import *
+from formals_lib.automata_ops import AutomataConcat
 from formals_lib.automata_determ import *
 from formals_lib.automata_minimize import *
+from formals_lib.automata_intersect import *
+from formals_lib.automata_complement import *
 from formals_lib.regex_automata import *
+from formals_lib.regex_derivatives import *
 from formals_lib.regex_parser import parse_regex
 from formals_lib.automata_cmp import compare_automatas
-
-from regex_to_re import regex_to_re
+from formals_lib.charclass import CharClass
+from formals_lib.automata_alphabet import *
+from formals_lib.automata_match import *
+from formals_lib.automata_bytes import *
+from formals_lib.automata_multi import *
+from formals_lib.automata_search import *
+from formals_lib.automata_codegen import *
+from formals_lib.automata_codegen import _compile_source, _CODE_CACHE_SIZE
+from formals_lib.regex_re import *
+from formals_lib.automata_frozen import *
 
 
 @dataclasses.dataclass(frozen=True)
@@ -39,6 +54,7 @@ class AutomataTest(unittest.TestCase):
 
     @staticmethod
     def check_word(aut: Automata, word: str) -> bool:
+        # Deliberately naive, since it's the reference for the library's matchers
         queue: typing.Deque[_WordState] = deque()
         queue.append(_WordState(aut.start, word))
 
@@ -55,10 +71,13 @@ class AutomataTest(unittest.TestCase):
                 return True
             
             for edge in state.node.out:
-                if not state.suffix.startswith(edge.label):
+                if isinstance(edge.label, CharClass):
+                    if state.suffix[:1] not in edge.label:
+                        continue
+                elif not state.suffix.startswith(edge.label):
                     continue
 
-                queue.append(_WordState(edge.dst, state.suffix[len(edge.label):]))
+                queue.append(_WordState(edge.dst, state.suffix[len(edge):]))
         
         return False
 
@@ -114,6 +133,21 @@ class AutomataTest(unittest.TestCase):
     def assertCorrectA2R(self, aut: Automata, **kwargs) -> None:
         return self.assertEquivRegex(automata_to_regex(aut), aut)
     
+    @staticmethod
+    def count_letters(regex: Regex) -> int:
+        if isinstance(regex, Letter):
+            return 1
+        
+        if isinstance(regex, CharSet):
+            return int(bool(regex.charclass))
+        
+        result: int = sum(map(AutomataTest.count_letters, regex.get_children()))
+        
+        if isinstance(regex, Repeat):
+            result *= regex.max if regex.max is not None else max(regex.min, 1)
+        
+        return result
+    
     @staticmethod
     def random_wordlist(alphabet: str, size: int = 10, wordlen: int = 5) -> typing.Generator[str, None, None]:
         for i in range(size):
@@ -243,6 +277,25 @@ class AutomataTest(unittest.TestCase):
             name="aut2 make_edges_01"
         )
         
+    def test_transform_edges_01_prefixes(self):
+        aut = Automata("ab")
+        aut.make_node(term=True)
+        
+        for label in ("ab", "ba", "aab", "aba", "a"):
+            aut.link(0, 1, label)
+        
+        split: Automata = make_edges_01(aut)
+        
+        # Only the 'a', 'b', 'aa' and 'ab' prefixes need intermediate nodes
+        self.assertEqual(len(split), 2 + 4)
+        self.assertTrue(all(len(edge) <= 1 for edge in split.get_edges()))
+        
+        self.assertEquivAutomatas(
+            aut, split,
+            wordlist=("ab", "ba", "aab", "aba", "a", "aa", "b", "abab", "bab"),
+            name="prefix-sharing make_edges_01"
+        )
+    
     def test_transform_edges_1(self):
         self.assertEquivAutomatas(
             self.aut2,
@@ -294,6 +347,197 @@ class AutomataTest(unittest.TestCase):
         for word in self.random_wordlist(fdfa.alphabet, size=50):
             self.assertAccepts(fdfa, word)
 
+        # Letter-only automatas get a sink edge per missing letter, not a class
+        fdfa = make_full_dfa(regex_to_automata(parse_regex("a"), alphabet="ab"))
+
+        self.assertEqual(sorted(edge.label for edge in fdfa.get_edges()), ["a", "a", "a", "b", "b", "b"])
+
+        # The class letters outside the alphabet are completed over a single class edge
+        fdfa = make_full_dfa(regex_to_automata(parse_regex("[a-d]"), alphabet="ab"))
+
+        self.assertEqual(
+            sorted(map(str, (edge.label for edge in fdfa.get_edges()))),
+            ["[a-d]", "[cd]", "[cd]", "a", "a", "b", "b"],
+        )
+        aut: Automata = self.aut1.copy()
+        
+        self.assertEqual(len(aut), len(self.aut1))
+        self.assertEqual(len(aut.get_edges()), len(self.aut1.get_edges()))
+        self.assertEqual(aut.start.key, self.aut1.start.key)
+        self.assertIsNot(aut.start, self.aut1.start)
+        self.assertEquivAutomatas(self.aut1, aut, self.basic_wordlist, name="aut1 copy")
+        
+        aut.node((0, 1)).is_term = False
+        aut.link((0, 0), (0, 0), "a")
+        aut.change_key((1, 1), "new")
+        
+        self.assertTrue(self.aut1.node((0, 1)).is_term)
+        self.assertEqual(len(self.aut1.start.out), 2)
+        self.assertIn((1, 1), self.aut1)
+        self.assertNotIn((1, 1), aut)
+        self.assertIn("new", aut)
+    
+    def test_inplace(self):
+        transforms: typing.Final[typing.Tuple[typing.Callable[..., Automata], ...]] = (
+            make_edges_01, make_edges_1, unify_term, aut_star, aut_pow_plus, aut_trim,
+        )
+        
+        for transform in transforms:
+            with self.subTest(transform=transform.__name__):
+                expected: Automata = transform(self.aut2)
+                
+                aut: Automata = self.define_aut2()
+                result: Automata = transform(aut, inplace=True)
+                
+                self.assertIs(result, aut)
+                self.assertEquivAutomatas(
+                    expected, result, self.basic_wordlist, rand_wl_size=50,
+                    name=f"aut2 {transform.__name__} inplace"
+                )
+        
+        aut: Automata = self.define_aut1()
+        self.assertIs(make_full_dfa(aut, inplace=True), aut)
+        self.assertIsNot(make_full_dfa(self.aut2, inplace=True), self.aut2)
+
+    def test_trim(self):
+        aut: Automata = self.aut2
+        
+        for coaccessible in (False, True):
+            with self.subTest(coaccessible=coaccessible):
+                trimmed: Automata = aut_trim(aut, coaccessible=coaccessible)
+                
+                self.assertLessEqual(len(trimmed), len(aut))
+                self.assertEquivAutomatas(
+                    aut, trimmed, self.basic_wordlist, rand_wl_size=50,
+                    name=f"aut2 trim coaccessible={coaccessible}"
+                )
+        
+        aut = self.aut0.copy()
+        aut.make_node(key="dead")
+        aut.make_node(key="unreachable", term=True)
+        aut.link(0, "dead", "b")
+        aut.link(0, "dead", "a")
+        aut.link("dead", "dead", "a")
+        
+        self.assertEqual(len(aut_trim(aut)), 2)
+        self.assertEqual(len(aut_trim(aut, coaccessible=True)), 1)
+        
+        # Dead states must not survive determinization
+        self.assertEqual(len(make_dfa(aut)), 1)
+    
+    def test_nfa_accepts(self):
+        auts: typing.List[Automata] = [
+            self.aut0, self.aut1, self.aut2,
+            regex_to_automata("(ab+1)*(a+b)^{2,3}c"), regex_to_automata("[a-c]^+b*", method="glushkov"),
+        ]
+        
+        for i, aut in enumerate(auts):
+            with self.subTest(i=i):
+                matcher = DFAMatcher(aut)
+                simulator = NFASimulator(aut)
+                
+                for word in itertools.chain(self.basic_wordlist, self.random_wordlist(aut.alphabet + "c", size=100)):
+                    expected: bool = self.check_word(aut, word)
+                    
+                    self.assertEqual(simulator.accepts(word), expected, f"Mismatch on '{word}'")
+                    self.assertEqual(matcher.accepts(word), expected, f"Mismatch on '{word}'")
+        
+        aut = Automata("ab")
+        aut.make_node(term=True)
+        aut.link(0, 0, "")
+        aut.link(0, 1, "aba")
+        aut.link(1, 0, "")
+        
+        self.assertTrue(nfa_accepts(aut, "abaaba"))
+        self.assertFalse(nfa_accepts(aut, "ab"))
+        self.assertFalse(nfa_accepts(aut, ""))
+    
+    def test_reverse(self):
+        for i in range(3):
+            with self.subTest(i=i):
+                aut: Automata = getattr(self, f"aut{i}")
+                reversed_aut: Automata = aut_reverse(aut)
+                
+                self.assertEqual(len(reversed_aut), len(aut) + 1)
+                
+                for word in itertools.chain(self.basic_wordlist, self.random_wordlist(aut.alphabet, size=50)):
+                    self.assertEqual(self.check_word(reversed_aut, word[::-1]), self.check_word(aut, word))
+                
+                self.assertEquivAutomatas(
+                    aut, aut_reverse(reversed_aut), self.basic_wordlist, rand_wl_size=50,
+                    name=f"aut{i} reversed twice"
+                )
+        
+        aut: Automata = regex_to_automata("abc[x-z]^+")
+        self.assertAccepts(aut_reverse(aut), "xzcba")
+        self.assertNotAccepts(aut_reverse(aut), "abcx")
+        
+        aut = self.aut0.copy()
+        self.assertIs(aut_reverse(aut, inplace=True), aut)
+        self.assertAccepts(aut, "aa")
+    
+    def test_intersect(self):
+        from formals_lib import automata_ops
+        
+        # Still importable from where it used to live
+        self.assertIs(automata_ops.aut_intersect, aut_intersect)
+        
+        aut: Automata = aut_intersect(self.aut0, self.aut1)
+        
+        # aut0 only accepts a^n, and aut1 wants an odd number of b's
+        self.assertEqual(len(aut), 1)
+        
+        aut = aut_intersect(self.aut1, self.aut1)
+        self.assertEquivAutomatas(self.aut1, aut, self.basic_wordlist, name="aut1 & aut1")
+        self.assertNotAccepts(aut, "")
+        self.assertNotAccepts(aut, "aa")
+        
+        aut = aut_intersect(regex_to_automata("(a+b)*a"), regex_to_automata("(ab)*"))
+        self.assertNotAccepts(aut, "a")
+        self.assertNotAccepts(aut, "abab")
+        
+        aut = aut_intersect(regex_to_automata("(a+b)*"), regex_to_automata("(ab)*"))
+        self.assertEquivRegex("(ab)*", aut, wordlist=("", "ab", "abab", "aba", "ba"))
+
+    def test_nary_ops(self):
+        auts: typing.List[Automata] = [self.aut0, self.aut1, regex_to_automata("ab+b")]
+        
+        self.assertEquivAutomatas(
+            aut_concat_many(auts), aut_concat(aut_concat(*auts[:2]), auts[2]),
+            self.basic_wordlist, rand_wl_size=50, name="concat_many"
+        )
+        self.assertEquivAutomatas(
+            aut_join_many(auts), aut_join(aut_join(*auts[:2]), auts[2]),
+            self.basic_wordlist, rand_wl_size=50, name="join_many"
+        )
+        
+        self.assertAccepts(aut_concat_many([]), "")
+        self.assertNotAccepts(aut_join_many([]), "")
+        
+        words: typing.Final[typing.List[str]] = [
+            "w" + "".join(letters) + "x" for letters in itertools.product("abc", repeat=5)
+        ]
+        aut: Automata = regex_to_automata(" + ".join(words))
+        
+        for word in words[::37]:
+            self.assertAccepts(aut, word)
+        self.assertNotAccepts(aut, "wabx")
+    
+    def test_flat_keys(self):
+        aut: Automata = regex_to_automata("abcdefg(a+b+c+d)*")
+        
+        self.assertTrue(all(isinstance(node.key, int) for node in aut.get_nodes()))
+        
+        op = AutomataConcat(self.aut1, self.aut0, keep_provenance=True)
+        aut = op.apply()
+        
+        self.assertTrue(all(isinstance(node.key, int) for node in aut.get_nodes()))
+        self.assertEqual(op.merged(0, self.aut1.start).key, next(iter(aut.start.out)).dst.key)
+        self.assertEqual(
+            {op.provenance[node.key] for node in aut.get_nodes() if node is not aut.start},
+            {(0, node.key) for node in self.aut1.get_nodes()} | {(1, node.key) for node in self.aut0.get_nodes()}
+        )
+    
     def test_regex(self):
         common_wordlist: typing.Final[typing.Tuple[str, ...]] = (
             "", "a", "b", "ab", "ba", "abc", "cab", "a+b", "0", "a b",
@@ -303,7 +547,7 @@ class AutomataTest(unittest.TestCase):
         regexes: typing.Final[typing.Tuple[Regex, ...]] = (
             "0", "1", "a", "ab", "a+b", "a*", "(a)", "(ab)", "(a+b)",
             "(a)*", "(a*)", "(a + b) c", "(a + b)^3", "(a + b)*",
-            "a(b*a)^2*",
+            "a(b*a)^2*", "(ab+b)^{1,3}", "a^{2,}b",
         )
         
         for regex in regexes:
@@ -316,6 +560,394 @@ class AutomataTest(unittest.TestCase):
                 self.assertEquivRegex(regex,   aut, wordlist=common_wordlist, rand_wl_size=25)
                 self.assertEquivRegex(regex_2, aut, wordlist=common_wordlist, rand_wl_size=25)
     
+    def test_regex_glushkov(self):
+        regexes: typing.Final[typing.Tuple[str, ...]] = (
+            "0", "1", "a", "ab", "a+b", "a*", "(a + b) c", "(a + b)^3", "(a + b)*",
+            "a(b*a)^2*", "(1+aa)(b+ba)*bb*aa*", "(a*b*)*c", "(0+1)a", "0*", "(a+1)(b+1)",
+            "(ab+b)^{1,3}", "a^{2,}b", "(a+1)^{0,2}b^+", "(a*b)^{2,3}",
+        )
+        
+        for regex in regexes:
+            with self.subTest(regex=regex):
+                aut: Automata = regex_to_automata(regex, method="glushkov")
+                positions: int = self.count_letters(parse_regex(regex))
+                
+                self.assertEqual(len(aut), positions + 1)
+                self.assertTrue(all(len(edge) == 1 for edge in aut.get_edges()))
+                self.assertEquivRegex(regex, aut, rand_wl_size=50)
+                self.assertTrue(compare_automatas(aut, regex_to_automata(regex)))
+    
+    def test_regex_derivatives(self):
+        regexes: typing.Final[typing.Tuple[str, ...]] = (
+            "0", "1", "a", "ab", "a+b", "a*", "(a + b) c", "(a + b)^3", "(a + b)*",
+            "a(b*a)^2*", "(1+aa)(b+ba)*bb*aa*", "(a*b*)*c", "(ab+ba)*(1+a+ba)",
+            "(ab+b)^{1,3}", "a^{2,}b", "(a+1)^{0,2}b^+", "(a*b)^{2,3}",
+        )
+        
+        for regex in regexes:
+            with self.subTest(regex=regex):
+                dfa: Automata = regex_to_dfa(regex, method="derivatives")
+                
+                self.assertTrue(dfa.is_deterministic())
+                self.assertEquivRegex(regex, dfa, rand_wl_size=50)
+                self.assertTrue(compare_automatas(dfa, regex_to_dfa(regex)))
+        
+        matcher = DerivativeMatcher(parse_regex("(a+b)*a(a+b)^3"))
+        
+        self.assertTrue(matcher.accepts("abbb"))
+        self.assertFalse(matcher.accepts("babb"))
+        self.assertFalse(matcher.accepts("abcb"))
+        # Only the states the input has reached get derived
+        self.assertLess(len(matcher), 16)
+    
+    def test_regex_antimirov(self):
+        regexes: typing.Final[typing.Tuple[str, ...]] = (
+            "0", "1", "a", "ab", "a+b", "a*", "(a + b) c", "(a + b)^3", "(a + b)*",
+            "a(b*a)^2*", "(1+aa)(b+ba)*bb*aa*", "(a*b*)*c", "(ab+ba)*(1+a+ba)",
+            "(ab+b)^{1,3}", "a^{2,}b", "(a+1)^{0,2}b^+", "(a*b)^{2,3}",
+        )
+        
+        for regex in regexes:
+            with self.subTest(regex=regex):
+                aut: Automata = regex_to_automata(regex, method="antimirov")
+                
+                self.assertLessEqual(len(aut), len(regex_to_automata(regex, method="glushkov")))
+                self.assertTrue(all(len(edge) == 1 for edge in aut.get_edges()))
+                self.assertEquivRegex(regex, aut, rand_wl_size=50)
+                self.assertTrue(compare_automatas(aut, regex_to_automata(regex)))
+    
+    def test_charclass(self):
+        regexes: typing.Final[typing.Tuple[str, ...]] = (
+            "[a-e]", "[a-e]*", "[a-d]x + [c-g]y", "([a-c] + [b-e])*a", "[ab0-2]^{2,3}[c-g]",
+            "([a-f]+b)*[b-d]*", "[a\\-c]", "[]a + b",
+        )
+        
+        for regex in regexes:
+            with self.subTest(regex=regex):
+                for method in ("thompson", "glushkov", "antimirov"):
+                    self.assertEquivRegex(regex, regex_to_automata(regex, method=method), rand_wl_size=50)
+                
+                dfa: Automata = regex_to_dfa(regex)
+                
+                self.assertTrue(dfa.is_deterministic())
+                self.assertEquivRegex(regex, dfa, rand_wl_size=50)
+                self.assertEquivRegex(regex, minimize(dfa), rand_wl_size=50)
+                self.assertTrue(compare_automatas(dfa, regex_to_dfa(regex, method="derivatives")))
+                self.assertEquivRegex(automata_to_regex(dfa), dfa, rand_wl_size=50)
+        
+        # The size of the DFA doesn't depend on the width of the classes
+        for width in (3, 26, 1000):
+            with self.subTest(width=width):
+                charset: Regex = CharSet(CharClass(((0x100, 0x100 + width - 1),)))
+                dfa: Automata = regex_to_dfa(Concat(Star(charset), Letter("z"), charset))
+                
+                self.assertLessEqual(len(dfa), 4)
+                self.assertLessEqual(len(dfa.get_edges()), 5)
+        
+        # Overlapping classes are split into disjoint ones
+        dfa: Automata = regex_to_dfa("[a-m]x + [h-z]y")
+        self.assertTrue(dfa.is_deterministic())
+        self.assertEqual(len(dfa.start.out), 3)
+        self.assertFalse(self.check_word(aut_intersect(dfa, regex_to_automata("[h-j]x")), "ky"))
+        self.assertTrue(self.check_word(aut_intersect(dfa, regex_to_automata("[h-j]x")), "ix"))
+        
+        # Negated classes stay single edges, and aren't spelled out in the alphabet
+        for method in ("thompson", "glushkov"):
+            aut: Automata = regex_to_automata("[^a-c]x", method=method)
+            
+            self.assertEqual(aut.alphabet, "x")
+            self.assertAccepts(aut, "\U0001f600x")
+            self.assertAccepts(aut, "xx")
+            self.assertNotAccepts(aut, "bx")
+        
+        # The letters of the classes still count for the complement
+        aut = complement(regex_to_automata("[a-c]x"))
+        self.assertAccepts(aut, "b")
+        self.assertAccepts(aut, "bxx")
+        self.assertNotAccepts(aut, "cx")
+    
+    def test_alphabet_classes(self):
+        aut: Automata = regex_to_dfa("[a-m]x + [h-z]y")
+        classes: AlphabetClasses = AlphabetClasses(aut)
+        
+        # a-g, h-m, n-w and z, x, y
+        self.assertEqual(len(classes), 5)
+        self.assertEqual(classes.class_of("n"), classes.class_of("z"))
+        self.assertEqual(classes.class_of("a"), classes.class_of("g"))
+        self.assertNotEqual(classes.class_of("g"), classes.class_of("h"))
+        self.assertEqual(classes.class_of("n"), classes.class_of("w"))
+        self.assertIsNone(classes.class_of("A"))
+        self.assertEqual(classes.expand(classes.class_of("i")), CharClass.from_ranges([("h", "m")]))
+        self.assertEqual(len(classes.classes_of(CharClass.from_ranges([("a", "m")]))), 2)
+        self.assertEqual(
+            classes.classes_of(CharClass.from_ranges([("h", "z")])),
+            sorted({classes.class_of(letter) for letter in "hnxyz"})
+        )
+        self.assertEqual(classes.classes_of("y"), [classes.class_of("y")])
+        
+        # The width of the alphabet doesn't matter, only the behaviours do
+        wide: Automata = regex_to_dfa(Concat(CharSet(CharClass(((0x100, 0x2000),))), Letter("a")))
+        self.assertEqual(len(AlphabetClasses(wide)), 2)
+        # Including the sink
+        self.assertEqual(len(minimize(wide)), 4)
+    
+    def test_dfa_matcher(self):
+        regexes: typing.Final[typing.Tuple[str, ...]] = (
+            "0", "1", "a", "a+b", "(a + b)^3", "(a + b)*a", "[a-e]*f", "[a-d]x + [c-g]y",
+            "(1+aa)(b+ba)*bb*aa*", "(ab+b)^{1,3}",
+        )
+        
+        for regex in regexes:
+            with self.subTest(regex=regex):
+                matcher: DFAMatcher = DFAMatcher(regex_to_automata(regex))
+                py_re: re.Pattern = regex_to_re(parse_regex(regex))
+                
+                for word in self.random_wordlist("abcfxyz", size=100, wordlen=5):
+                    self.assertEqual(matcher.accepts(word), bool(py_re.fullmatch(word)), word)
+    
+    def test_freeze(self):
+        regexes: typing.Final[typing.Tuple[str, ...]] = (
+            "0", "1", "(a + b)*a", "[a-d]x + [c-g]y", "(1+aa)(b+ba)*bb*aa*", "(ab+b)^{1,3}",
+        )
+        
+        for regex in regexes:
+            with self.subTest(regex=regex):
+                aut: Automata = regex_to_automata(regex)
+                frozen: FrozenAutomata = aut.freeze()
+                
+                for word in itertools.chain([""], self.random_wordlist("abcfxyz", size=100, wordlen=5)):
+                    self.assertEqual(frozen.accepts(word), self.check_word(aut, word), word)
+                
+                self.assertEqual(frozen, freeze(regex_to_automata(regex)))
+                self.assertEqual(hash(frozen), hash(freeze(regex_to_automata(regex))))
+        
+        frozen = self.aut1.freeze()
+        
+        with self.assertRaises(dataclasses.FrozenInstanceError):
+            frozen.start = 1
+        
+        self.assertEqual(len({frozen, self.aut1.freeze(), self.aut0.freeze()}), 2)
+    
+    def test_accepts_many(self):
+        aut: Automata = self.aut2
+        frozen: FrozenAutomata = aut.freeze()
+        words: typing.List[str] = list(self.random_wordlist(aut.alphabet, size=5000, wordlen=4))
+        expected: typing.List[bool] = [frozen.accepts(word) for word in words]
+        
+        self.assertEqual(accepts_many(frozen, words, max_workers=8, chunk_size=100), expected)
+        self.assertEqual(accepts_many(aut, iter(words), max_workers=2), expected)
+        self.assertEqual(accepts_many(frozen, words[:500], max_workers=2, chunk_size=100, processes=True), expected[:500])
+        self.assertEqual(accepts_many(aut, []), [])
+
+        with self.assertRaises(ValueError):
+            accepts_many(frozen, words, chunk_size=0)
+        
+        for word in words[:200]:
+            self.assertEqual(frozen.accepts(word), self.check_word(aut, word), word)
+    
+    def test_compile_regex(self):
+        regexes: typing.Final[typing.Tuple[str, ...]] = (
+            "0", "1", "a", "(a + b)*a", "[a-e]*f", "[a-d]x + [c-g]y", "(1+aa)(b+ba)*bb*aa*",
+            "(ab+b)^{1,3}", "((a+b)^2)*", "(a*)^+", "1*", "(1a)*", "1^{2,3}",
+        )
+        
+        for regex in regexes:
+            with self.subTest(regex=regex):
+                matchers = [compile_regex(regex, backend=backend) for backend in ("re", "automata")]
+                
+                for word in itertools.chain([""], self.random_wordlist("abcfxyz", size=200, wordlen=5)):
+                    self.assertEqual(matchers[0].accepts(word), matchers[1].accepts(word), word)
+        
+        # The letters special to re must come out escaped
+        self.assertTrue(compile_regex(Concat(Letter("."), Letter("*"))).accepts(".*"))
+        self.assertFalse(compile_regex(Concat(Letter("."), Letter("*"))).accepts("a"))
+        self.assertTrue(compile_regex(CharSet(CharClass.from_letters("]-^\\"))).accepts("\\"))
+        self.assertFalse(compile_regex(CharSet(CharClass.from_letters("]-^\\"))).accepts("a"))
+        
+        with self.assertRaises(ValueError):
+            compile_regex("a", backend="pcre")
+    
+    def test_compile_to_python(self):
+        regexes: typing.Final[typing.Tuple[str, ...]] = (
+            "0", "1", "a", "(a + b)*a", "[a-e]*f", "[a-d]x + [c-g]y", "(1+aa)(b+ba)*bb*aa*", "(ab+b)^{1,3}",
+        )
+        
+        for regex in regexes:
+            for mode in ("if", "table", None):
+                with self.subTest(regex=regex, mode=mode):
+                    aut: Automata = regex_to_automata(regex)
+                    compiled: CompiledMatcher = compile_to_python(aut, mode=mode)
+                    py_re: re.Pattern = regex_to_re(parse_regex(regex))
+                    
+                    for word in itertools.chain([""], self.random_wordlist("abcfxyz", size=100, wordlen=5)):
+                        self.assertEqual(compiled(word), bool(py_re.fullmatch(word)), word)
+                    
+                    self.assertEqual(CompiledMatcher(compiled.source).source, compiled.source)
+        
+        wide = Automata("a")
+        wide.make_node(term=True)
+        wide.link(0, 1, CharClass(((0x80, 0x10FFFF),)))
+        
+        # Too wide for the tables, so the ranges are compared instead
+        self.assertEqual(DFACodegen(wide).default_mode(), "if")
+        self.assertTrue(compile_to_python(wide).accepts(chr(0x1F600)))
+        self.assertFalse(compile_to_python(wide).accepts("a"))
+        
+        with self.assertRaises(ValueError):
+            compile_to_python(regex_to_automata("a"), mode="jit")
+        
+        # The compiled code is cached, but only for so many distinct sources
+        for i in range(1, _CODE_CACHE_SIZE + 10):
+            self.assertTrue(compile_to_python(regex_to_automata("a" * i), mode="if").accepts("a" * i))
+        
+        self.assertLessEqual(_compile_source.cache_info().currsize, _CODE_CACHE_SIZE)
+    
+    @utils.benchmark
+    def test_compile_to_python_speed(self):
+        aut: Automata = regex_to_automata("(a+b)*abb(a+b)^{0,3}")
+        text: str = self.random_word("ab", wordlen=1) + "ab" * 100000
+        
+        for name, accepts in (("DFAMatcher", DFAMatcher(aut).accepts), ("compile_to_python", compile_to_python(aut).accepts)):
+            start: float = time.perf_counter()
+            accepts(text)
+            elapsed: float = time.perf_counter() - start
+            
+            print(f"\n{name}: {len(text) / elapsed:.0f} letters/sec", end="")
+    
+    def test_utf8_sequences(self):
+        ranges: typing.Final[typing.Tuple[typing.Tuple[int, int], ...]] = (
+            (0, 0x10FFFF), (0x80, 0x7FF), (0x3B1, 0x3C9), (0x7A, 0x10FF), (0xD000, 0xE100), (0x1F600, 0x1F64F),
+        )
+        
+        rng = random.Random(42)
+        
+        for lo, hi in ranges:
+            with self.subTest(lo=hex(lo), hi=hex(hi)):
+                sequences = list(utf8_sequences(lo, hi))
+                
+                for _ in range(500):
+                    code: int = rng.choice((rng.randint(0, 0x10FFFF), rng.randint(max(lo - 3, 0), hi + 3)))
+                    if 0xD800 <= code <= 0xDFFF:
+                        continue
+                    
+                    encoded: bytes = chr(code).encode()
+                    matches: int = sum(
+                        len(sequence) == len(encoded) and all(a <= byte <= b for byte, (a, b) in zip(encoded, sequence))
+                        for sequence in sequences
+                    )
+                    
+                    self.assertEqual(matches, int(lo <= code <= hi), hex(code))
+    
+    def test_bytes(self):
+        regex: str = "[α-ω]^+x[a-cё]*"
+        matcher: DFAMatcher = DFAMatcher(aut_to_utf8(regex_to_automata(regex)))
+        py_re: re.Pattern = regex_to_re(parse_regex(regex))
+        
+        for word in self.random_wordlist("αβωxaёcd", size=200, wordlen=5):
+            self.assertEqual(matcher.accepts_bytes(word.encode()), bool(py_re.fullmatch(word)), word)
+        
+        self.assertTrue(matcher.accepts_bytes(memoryview("αωxёa".encode())))
+        self.assertFalse(matcher.accepts_bytes(b"\xce"))
+        self.assertFalse(matcher.accepts_bytes(b"\xff"))
+        
+        with tempfile.TemporaryFile() as file:
+            file.write("ββββxё".encode())
+            file.flush()
+            
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                self.assertTrue(matcher.accepts_bytes(mapped))
+        
+        # Without lowering, the letters themselves are the bytes
+        high: Regex = Star(CharSet(CharClass(((0x80, 0xFF),))))
+        matcher = DFAMatcher(regex_to_automata(high, alphabet=BYTE_ALPHABET))
+        
+        self.assertTrue(matcher.accepts_bytes(bytes([0x80, 0xFF, 0x90])))
+        self.assertFalse(matcher.accepts_bytes(b"\x80a"))
+    
+    def test_compile_set(self):
+        patterns: typing.Final[typing.Tuple[str, ...]] = (
+            "a*b", "(a+b)*b", "ab", "[a-c]^2", "1", "(a+b)*b", "0", "c(a+b)^{0,2}",
+        )
+        
+        py_res: typing.List[re.Pattern] = [regex_to_re(parse_regex(pattern)) for pattern in patterns]
+        
+        for minimal in (False, True):
+            pattern_set: PatternSet = compile_set(patterns, minimal=minimal)
+            
+            for word in itertools.chain([""], self.random_wordlist("abcd", size=300, wordlen=3)):
+                with self.subTest(minimal=minimal, word=word):
+                    expected: typing.FrozenSet[int] = frozenset(
+                        i for i, py_re in enumerate(py_res) if py_re.fullmatch(word)
+                    )
+                    
+                    self.assertEqual(pattern_set.match(word), expected)
+                    self.assertEqual(pattern_set.match_bytes(word.encode()), expected)
+        
+        # Minimization mustn't merge the terms of different patterns
+        self.assertEqual(len(minimize(regex_to_automata("a+b"))), 3)
+        self.assertEqual(len(compile_set(["a", "b"]).aut), 4)
+        self.assertEqual(compile_set(["a", "b"]).match("b"), {1})
+    
+    @staticmethod
+    def brute_finditer(py_re: re.Pattern, text: str, overlapping: bool) -> typing.List[typing.Tuple[int, int]]:
+        def is_match(start: int, end: int) -> bool:
+            return py_re.fullmatch(text, start, end) is not None
+        
+        result: typing.List[typing.Tuple[int, int]] = []
+        
+        if overlapping:
+            for end in range(len(text) + 1):
+                start: int | None = next((start for start in range(end + 1) if is_match(start, end)), None)
+                
+                if start is not None:
+                    result.append((start, end))
+            
+            return result
+        
+        pos: int = 0
+        
+        while pos <= len(text):
+            ends: typing.List[int] = [end for end in range(pos, len(text) + 1) if is_match(pos, end)]
+            
+            if not ends:
+                pos += 1
+                continue
+            
+            result.append((pos, ends[-1]))
+            pos = ends[-1] if ends[-1] > pos else pos + 1
+        
+        return result
+    
+    def test_search(self):
+        patterns: typing.Final[typing.Tuple[str, ...]] = (
+            "ab", "a*b", "(ab)^+", "a+b^2", "1", "[a-b]c*", "a*", "0", "b(a+c)^{1,3}b",
+        )
+        
+        for pattern in patterns:
+            regex: Regex = parse_regex(pattern)
+            py_re: re.Pattern = regex_to_re(regex)
+            searcher = AutomataSearcher(regex_to_automata(regex))
+            
+            for text in itertools.chain(["", "abab"], self.random_wordlist("abcd", size=50, wordlen=12)):
+                for overlapping in (False, True):
+                    with self.subTest(pattern=pattern, text=text, overlapping=overlapping):
+                        self.assertEqual(
+                            list(searcher.finditer(text, overlapping=overlapping)),
+                            self.brute_finditer(py_re, text, overlapping),
+                        )
+        
+        aut: Automata = regex_to_automata("a(b+c)^+")
+        
+        # Letters outside of the alphabet just never match
+        self.assertEqual(search(aut, "xyzacbcz"), (3, 7))
+        self.assertEqual(search(aut, "xyz"), None)
+        self.assertEqual(list(finditer(aut, "abacab", overlapping=True)), [(0, 2), (2, 4), (4, 6)])
+        self.assertEqual(list(finditer(regex_to_automata("a^+"), "aaa", overlapping=True)), [(0, 1), (0, 2), (0, 3)])
+        
+        # Every end has its match starting at 0, which mustn't be walked back to each time
+        text: str = "a" * 100000
+        self.assertEqual(list(finditer(regex_to_automata("a*"), text, overlapping=True)), [(0, end) for end in range(len(text) + 1)])
+    
     def test_regex_2(self):
         for i in range(2):
             with self.subTest(i=i):
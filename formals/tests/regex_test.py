@@ -1,9 +1,41 @@
 from __future__ import annotations
 import typing
 import unittest
+import copy
+import io
+import pickle
+import time
 
 import utils
-from formals_lib import regex, regex_optimize, regex_parser, regex_suff_parser
+from formals_lib import regex, regex_optimize, regex_parser, regex_suff_parser, \
+    regex_longestsuff, regex_derivatives
+from formals_lib.itree import TreeVisitor
+from formals_lib.charclass import CharClass
+
+
+class _NodeCounter(TreeVisitor[regex.Regex]):
+    @TreeVisitor.handler(regex.Letter)
+    def visit_letter(self, node: regex.Letter) -> int:
+        return 1
+
+    @TreeVisitor.handler(regex.Regex)
+    def visit_regex(self, node: regex.Regex) -> typing.Generator[regex.Regex, int, int]:
+        result: int = 1
+
+        for child in node.get_children():
+            result += yield child
+
+        return result
+
+
+class _UncachedNodeCounter(_NodeCounter):
+    # Dispatches the way TreeVisitor did before it cached handlers per node type
+    def _dispatch(self, node: regex.Regex) -> typing.Any:
+        for base in type(node).__mro__:
+            if base in _NodeCounter._lookup:
+                return _NodeCounter._lookup[base](self, node)
+
+        return self.generic_visit(node)
 
 
 class RegexTest(unittest.TestCase):
@@ -32,6 +64,141 @@ class RegexTest(unittest.TestCase):
         self.assertNotEqual(self.regex1_tree, self.regex2)
         self.assertNotEqual(self.regex1, self.regex2)
 
+    def test_interning(self):
+        self.assertIs(self.regex1_tree, self.regex1)
+        self.assertIs(regex.Zero(), regex.Zero())
+        self.assertIs(regex.Letter("a"), regex.Letter("a"))
+        self.assertIsNot(regex.Letter("a"), regex.Letter("b"))
+        self.assertIsNot(regex.Concat(regex.Letter("a")), regex.Either(regex.Letter("a")))
+        
+        # Keyword arguments intern the same as positional ones
+        a: regex.Regex = regex.Letter("a")
+        self.assertIs(regex.Letter(letter="a"), a)
+        self.assertIs(regex.Repeat(a, min=2, max=3), regex.Repeat(a, 2, 3))
+        self.assertIs(regex.Repeat(max=None, child=a, min=1), regex.Repeat(a, 1, None))
+        self.assertRaises(TypeError, regex.Repeat, a, 2, minimum=3)
+        
+        self.assertEqual(hash(self.regex1_tree), hash(self.regex1))
+        self.assertEqual(len({self.regex1, self.regex1_tree, self.regex2}), 2)
+        
+        self.assertIs(copy.copy(self.regex2), self.regex2)
+        self.assertIs(copy.deepcopy(self.regex2), self.regex2)
+        self.assertIs(pickle.loads(pickle.dumps(self.regex2)), self.regex2)
+
+    def test_dag(self):
+        # A regex of depth 2 * 60, which would have ~2^60 nodes as a tree
+        re: regex.Regex = regex.Letter("a")
+        for i in range(60):
+            re = regex.Concat(regex.Star(re), regex.Either(re, regex.Letter("b")))
+        
+        optimized: regex.Regex = regex_optimize.optimize_regex(re)
+        self.assertIs(regex_optimize.optimize_regex(optimized), optimized)
+        
+        self.assertTrue(regex_longestsuff.regex_has_suffix(re, "a", 10 ** 9))
+        self.assertFalse(regex_longestsuff.regex_has_suffix(re, "c", 1))
+        self.assertTrue(regex_derivatives.regex_is_nullable(regex.Star(re)))
+        self.assertFalse(regex_derivatives.regex_is_nullable(re))
+
+    def test_canonical_either(self):
+        make_either = regex_optimize.RegexOptimizer.make_either
+        alternatives: typing.List[regex.Regex] = [
+            regex_parser.parse_regex(re) for re in ("ab", "b*", "[a-c]", "a^{2,3}")
+        ]
+        
+        self.assertIs(
+            make_either(alternatives, canonical=True),
+            make_either(reversed(alternatives), canonical=True),
+        )
+        self.assertIs(
+            make_either(alternatives[1:] + [regex.Either(*alternatives[:2])], canonical=True),
+            make_either(alternatives, canonical=True),
+        )
+
+    def test_deep(self):
+        depth: typing.Final[int] = 5000
+        
+        re: regex.Regex = regex.Letter("a")
+        for i in range(depth):
+            re = regex.Either(regex.Concat(re, regex.Letter("b")), regex.One())
+        
+        reconstructed: str = regex.reconstruct_regex(re)
+        self.assertEqual(reconstructed.count("("), depth - 1)
+        self.assertIs(regex_parser.parse_regex(reconstructed), re)
+        
+        optimized: regex.Regex = regex_optimize.optimize_regex(regex.Concat(re, regex.Zero()))
+        self.assertEqual(optimized, regex.Zero())
+        
+        self.assertTrue(regex_derivatives.regex_is_nullable(re))
+
+    def test_visit_counts(self):
+        width: typing.Final[int] = 50
+        
+        re: regex.Regex = regex.Concat(*[regex.Either(*[regex.Letter("ab"[i % 2]) for i in range(width)])] * width)
+        
+        self.assertEqual(_UncachedNodeCounter().visit(re), width * width + width + 1)
+        self.assertEqual(_NodeCounter().visit(re), width * width + width + 1)
+
+    @utils.benchmark
+    def test_visit_speed(self):
+        width: typing.Final[int] = 1000
+        
+        # Interning makes all the Eithers the same object, but an unmemoized
+        # visitor still walks all the 10^6 leaves
+        re: regex.Regex = regex.Concat(*[regex.Either(*[regex.Letter("ab"[i % 2]) for i in range(width)])] * width)
+        total: int = width * width + width + 1
+        
+        for visitor_type in (_UncachedNodeCounter, _NodeCounter):
+            start: float = time.perf_counter()
+            self.assertEqual(visitor_type().visit(re), total)
+            elapsed: float = time.perf_counter() - start
+            
+            print(f"\n{visitor_type.__name__}: {total / elapsed:.0f} visits/sec", end="")
+
+    def test_charclass(self):
+        a_z: CharClass = CharClass.from_ranges([("a", "z")])
+        vowels: CharClass = CharClass.from_letters("eaoiu")
+        
+        self.assertEqual(len(a_z), 26)
+        self.assertIn("q", a_z)
+        self.assertNotIn("Q", a_z)
+        self.assertNotIn("ab", a_z)
+        self.assertEqual(vowels.letters(), "aeiou")
+        self.assertEqual(CharClass.from_ranges([("a", "c"), ("d", "f"), ("b", "e")]), CharClass.from_ranges([("a", "f")]))
+        
+        self.assertEqual(a_z & vowels, vowels)
+        self.assertEqual(len(a_z - vowels), 21)
+        self.assertEqual(vowels | a_z, a_z)
+        self.assertTrue((~a_z).isdisjoint(a_z))
+        self.assertEqual(len(~~vowels), 5)
+        self.assertEqual(CharClass.from_letters("x").as_label(), "x")
+        
+        pieces: typing.Dict[typing.FrozenSet[int], CharClass] = {
+            indices: piece for piece, indices in CharClass.split([a_z, vowels, CharClass.from_letters("A")])
+        }
+        self.assertEqual(pieces, {
+            frozenset([0]): a_z - vowels,
+            frozenset([0, 1]): vowels,
+            frozenset([2]): CharClass.from_letters("A"),
+        })
+        
+        parse: typing.Callable[[str], regex.Regex] = regex_parser.parse_regex
+        
+        self.assertEqual(parse("[a-z]"), regex.CharSet(a_z))
+        self.assertEqual(parse("[aeiou]"), parse("[uoiea]"))
+        self.assertEqual(parse("[-a\\]]").charclass, CharClass.from_letters("-a]"))
+        self.assertEqual(parse("[^a-z]").charclass, ~a_z)
+        self.assertEqual(parse("[\\^a]").charclass, CharClass.from_letters("^a"))
+        self.assertEqual(parse("[a^]").charclass, CharClass.from_letters("^a"))
+        self.assertRaises(regex_parser.RegexSyntaxError, parse, "[z-a]")
+        self.assertRaises(regex_parser.RegexSyntaxError, parse, "[ab")
+        
+        for re in ("[a-z]*x", "[\\-\\]a]", "[]", "[0-9a-f]^{2,4}"):
+            with self.subTest(re=re):
+                self.assertEqual(regex.reconstruct_regex(parse(re)), re)
+        
+        self.assertEqual(regex_optimize.optimize_regex(parse("[]a")), regex.Zero())
+        self.assertEqual(regex_optimize.optimize_regex(parse("[a]")), regex.Letter("a"))
+
     def test_parse_reconstruct(self):
         parse = regex_parser.parse_regex
         reconstruct = regex.reconstruct_regex
@@ -72,18 +239,35 @@ class RegexTest(unittest.TestCase):
             regex.Either(regex.Letter("a"), regex.Letter("b")), regex.Letter("c")
         ))
 
-        self.assertEqual(parse("a^2"), regex.Concat(
-            regex.Letter("a"),
-            regex.Letter("a"),
-        ))
+        self.assertEqual(parse("a^2"), regex.Repeat(regex.Letter("a"), 2, 2))
+        self.assertEqual(parse("a^{2,5}"), regex.Repeat(regex.Letter("a"), 2, 5))
+        self.assertEqual(parse("a^{ 2, }"), regex.Repeat(regex.Letter("a"), 2, None))
+        self.assertEqual(parse("a ^+"), regex.Repeat(regex.Letter("a"), 1, None))
+        self.assertEqual(parse("a^1000"), regex.Letter("a").repeat(1000))
+        self.assertRaises(regex_parser.RegexSyntaxError, parse, "a^{3,2}")
 
         for re in ("(a+b)c", "a", "b*", "ac*", "(ac)*", "01", "1a0"):
             with self.subTest(re=re):
                 self.assertEqual(parse_back(re), re)
         
-        self.assertEqual(parse_back("(a+0)^2"), "(a+0)(a+0)")
-        self.assertEqual(parse_back("(a+0)^2*"), "((a+0)(a+0))*")
+        for re in ("(a+0)^2", "(a+0)^2*", "a^{2,5}b^+", "(ab)^{0,}", "a*^3"):
+            with self.subTest(re=re):
+                self.assertEqual(parse_back(re), re)
     
+    def test_parse_large(self):
+        count: typing.Final[int] = 20000
+        
+        parsed: regex.Regex = regex_parser.parse_regex(io.StringIO("(ab + c^2)* d " * count))
+        self.assertIsInstance(parsed, regex.Concat)
+        self.assertEqual(len(parsed.get_children()), 2 * count)
+        
+        self.assertRaises(regex_parser.RegexSyntaxError, regex_parser.parse_regex, "a + ")
+        self.assertRaises(regex_parser.RegexSyntaxError, regex_parser.parse_regex, "(a")
+        self.assertRaises(regex_parser.RegexSyntaxError, regex_parser.parse_regex, "a)")
+        self.assertRaises(regex_parser.RegexSyntaxError, regex_parser.parse_regex, "*a")
+        self.assertRaises(regex_parser.RegexSyntaxError, regex_parser.parse_regex, "()")
+        self.assertRaises(regex_parser.RegexSyntaxError, regex_parser.parse_regex, "a^")
+
     def test_suff_parse(self):
         samples: typing.Final[typing.List[
             typing.Tuple[str, str]
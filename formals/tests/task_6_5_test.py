@@ -5,7 +5,7 @@ import dataclasses
 import itertools
 
 import utils
-from formals_lib import regex, regex_parser, regex_longestsuff
+from formals_lib import regex, regex_parser, regex_suff_parser, regex_longestsuff
 
 
 @dataclasses.dataclass
@@ -38,6 +38,13 @@ class Task65Test(unittest.TestCase):
         TaskTestInfo("a(b+c)*d", "a", 0),
         TaskTestInfo("a+c+b+ccc+cccca", "c", 3),
         TaskTestInfo("a1*", "a", 1),
+        TaskTestInfo("(baa)^{1,3}", "a", 2),
+        TaskTestInfo("(a+b)^{0,3}", "a", 3),
+        TaskTestInfo("b^{2,}a^5", "a", 5),
+        TaskTestInfo("(ab)^+", "a", 0),
+        TaskTestInfo("(a+b)^+", "a", None),
+        TaskTestInfo("(a*)^1", "a", None),
+        TaskTestInfo("(a*)^{0,1}", "a", None),
         
         # The following two tests are from the example
         TaskTestInfo("((a+b)c + a(ba)* (b+ac))*", "a", 0),
@@ -68,6 +75,18 @@ class Task65Test(unittest.TestCase):
     def test_simple(self):
         for case in self.cases:
             self.handle_case(case)
+    
+    def test_deep(self):
+        # Left-deep chains, way deeper than the recursion limit
+        depth: typing.Final[int] = 20000
+        
+        re: regex.Regex = regex_suff_parser.parse_suff_regex("b" + "a." * depth)
+        self.assertTrue(regex_longestsuff.regex_has_suffix(re, "a", depth))
+        self.assertFalse(regex_longestsuff.regex_has_suffix(re, "a", depth + 1))
+        
+        re = regex_suff_parser.parse_suff_regex("b" + "a+" * depth + "a.")
+        self.assertTrue(regex_longestsuff.regex_has_suffix(re, "a", 2))
+        self.assertFalse(regex_longestsuff.regex_has_suffix(re, "a", 3))
 
 
 if __name__ == "__main__":
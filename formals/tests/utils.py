@@ -2,10 +2,13 @@ from __future__ import annotations
 import typing
 import pathlib
 import sys
+import os
+import unittest
 
 
 # So that formals_lib can be imported by the tests
 sys.path.append(str(pathlib.Path(__file__).parent.parent.absolute()))
 
 
-
+# The benchmarks only print timings, so they are opt-in: FORMALS_BENCHMARKS=1
+benchmark = unittest.skipUnless(os.environ.get("FORMALS_BENCHMARKS"), "set FORMALS_BENCHMARKS=1 to run")